@@ -0,0 +1,273 @@
+# 외부 환경(ex_temperature / ex_humidity / ex_illuminance)을 보정한 장비별 센서 기준선과 이상 점수입니다.
+#
+# 1. 기준선: 장비별로 내부 센서(PM10 / PM2.5 / PM1.0 / NTC)를 외부 환경 3개 값에 대해 선형 회귀합니다.
+#    장비별 회귀 통계(XᵀX, XᵀY, YᵀY)를 청크 단위로 누적한 뒤, 모든 장비와 센서의 계수를 한 번의 배치 연산으로 구합니다.
+# 2. 점수: 아직 점수가 없는 레코드만 장비별로 청크 단위로 읽어 센서별 잔차 z = (실측 - 기준선 예측) / 잔차 표준편차를 계산하고,
+#    |z|가 가장 큰 값을 레코드의 환경 보정 이상 점수로 ambient_score에 저장합니다.
+#    화면에서는 저장된 점수만 읽으므로 조회할 때마다 다시 계산하지 않습니다.
+#
+# 실행:
+#     python ambient_baseline.py           # 새로 적재된 레코드만 점수 계산
+#     python ambient_baseline.py --refit   # 기준선을 다시 학습하고 전체 점수를 다시 계산
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from data_access import DB_PATH, attach_partitions
+
+SENSOR_COLUMNS = ['PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value']
+AMBIENT_COLUMNS = ['ex_temperature', 'ex_humidity', 'ex_illuminance']
+Z_COLUMNS = [col.replace('_value', '_z') for col in SENSOR_COLUMNS]
+
+# 이상 기준: 환경 보정 잔차가 표준편차의 3배를 넘는 경우 (notebooks/지표 설계.ipynb의 3σ 기준과 동일)
+ANOMALY_THRESHOLD = 3.0
+# 장비별 기준선을 학습하기 위한 최소 레코드 수
+MIN_SAMPLES = 50
+DEFAULT_CHUNK_SIZE = 5000
+# 외부 환경 값이 거의 변하지 않는 장비에서도 계수를 구할 수 있도록 더하는 릿지 계수 (분산 대비 비율)
+RIDGE = 1e-6
+
+AMBIENT_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS ambient_baseline (
+    device_id TEXT,
+    sensor TEXT,
+    intercept REAL,
+    {', '.join(f'{col} REAL' for col in AMBIENT_COLUMNS)},
+    resid_std REAL,
+    sample_count INTEGER,
+    PRIMARY KEY (device_id, sensor)
+);
+
+CREATE TABLE IF NOT EXISTS ambient_score (
+    record_id INTEGER PRIMARY KEY,
+    device_id TEXT,
+    collection_date TEXT,
+    collection_time TEXT,
+    score REAL,
+    top_sensor TEXT,
+    {', '.join(f'{col} REAL' for col in Z_COLUMNS)}
+);
+
+CREATE INDEX IF NOT EXISTS idx_ambient_score_device ON ambient_score (device_id, collection_date, collection_time);
+
+CREATE TABLE IF NOT EXISTS ambient_score_progress (
+    device_id TEXT PRIMARY KEY,
+    last_record_id INTEGER
+);
+"""
+
+RECORD_QUERY = f"""
+SELECT
+    sr.record_id,
+    sr.device_id,
+    sr.collection_date,
+    sr.collection_time,
+    {', '.join('sr.' + col for col in SENSOR_COLUMNS)},
+    et.value AS ex_temperature,
+    eh.value AS ex_humidity,
+    ei.value AS ex_illuminance
+FROM sensor_record sr
+LEFT JOIN external_data et ON et.record_id = sr.record_id AND et.sensor_type = 'ex_temperature'
+LEFT JOIN external_data eh ON eh.record_id = sr.record_id AND eh.sensor_type = 'ex_humidity'
+LEFT JOIN external_data ei ON ei.record_id = sr.record_id AND ei.sensor_type = 'ex_illuminance'
+WHERE sr.device_id = ? AND sr.record_id > ?
+ORDER BY sr.record_id ASC
+"""
+
+def create_ambient_tables(conn: sqlite3.Connection):
+    """기준선/점수 관련 테이블과 인덱스를 생성합니다."""
+    conn.executescript(AMBIENT_SCHEMA)
+
+def _design_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """[1, 외부 온도, 외부 습도, 외부 조도] 설계 행렬을 반환합니다."""
+    x = frame[AMBIENT_COLUMNS].to_numpy(dtype=np.float64)
+    return np.hstack([np.ones((len(x), 1)), x])
+
+class AmbientBaseline:
+    """
+    장비별 환경 보정 기준선입니다.
+    coef는 (장비 수, 1 + 외부 환경 수, 센서 수) 배열로, 첫 행이 절편입니다.
+    """
+
+    def __init__(self, device_ids, coef: np.ndarray, resid_std: np.ndarray, sample_count: np.ndarray):
+        self.device_ids = pd.Index(device_ids, name='device_id')
+        self.coef = coef
+        self.resid_std = resid_std
+        self.sample_count = sample_count
+
+    def __len__(self):
+        return len(self.device_ids)
+
+    @classmethod
+    def fit(cls, conn: sqlite3.Connection, min_samples: int = MIN_SAMPLES, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        장비별 회귀 통계를 청크 단위로 누적하여 모든 장비의 기준선을 한 번에 학습합니다.
+        센서값이나 외부 환경 값이 빠진 레코드는 학습에서 제외합니다.
+        """
+        k, s = 1 + len(AMBIENT_COLUMNS), len(SENSOR_COLUMNS)
+        sums = {}
+        device_ids = [row[0] for row in conn.execute("SELECT DISTINCT device_id FROM sensor_record ORDER BY device_id;")]
+        for device_id in device_ids:
+            xtx, xty, yty, n = np.zeros((k, k)), np.zeros((k, s)), np.zeros(s), 0
+            for chunk in pd.read_sql_query(RECORD_QUERY, conn, params=(device_id, 0), chunksize=chunk_size):
+                chunk = chunk.dropna(subset=SENSOR_COLUMNS + AMBIENT_COLUMNS)
+                if chunk.empty:
+                    continue
+                x = _design_matrix(chunk)
+                y = chunk[SENSOR_COLUMNS].to_numpy(dtype=np.float64)
+                xtx += x.T @ x
+                xty += x.T @ y
+                yty += (y ** 2).sum(axis=0)
+                n += len(chunk)
+            if n >= min_samples:
+                sums[device_id] = (xtx, xty, yty, n)
+
+        if not sums:
+            return cls([], np.empty((0, k, s)), np.empty((0, s)), np.empty(0, dtype=np.int64))
+
+        xtx = np.stack([v[0] for v in sums.values()])
+        xty = np.stack([v[1] for v in sums.values()])
+        yty = np.stack([v[2] for v in sums.values()])
+        n = np.array([v[3] for v in sums.values()], dtype=np.float64)
+
+        # 평균을 뺀 공분산 형태로 바꾸어 (조도처럼 단위가 큰 변수가 있어도) 수치적으로 안정적으로 풉니다.
+        nn = n[:, None]
+        x_mean = xtx[:, 0, 1:] / nn
+        y_mean = xty[:, 0, :] / nn
+        cxx = xtx[:, 1:, 1:] / n[:, None, None] - x_mean[:, :, None] * x_mean[:, None, :]
+        cxy = xty[:, 1:, :] / n[:, None, None] - x_mean[:, :, None] * y_mean[:, None, :]
+        cyy = yty / nn - y_mean ** 2
+        ridge = RIDGE * np.diagonal(cxx, axis1=1, axis2=2) + 1e-12
+        slope = np.linalg.solve(cxx + ridge[:, :, None] * np.eye(k - 1), cxy)
+        intercept = y_mean - np.einsum('dk,dks->ds', x_mean, slope)
+
+        # 잔차 제곱합 = n × (Var(y) - 2βᵀCov(x, y) + βᵀCov(x)β)
+        sse = nn * (cyy - 2 * np.einsum('dks,dks->ds', slope, cxy) + np.einsum('dks,dkl,dls->ds', slope, cxx, slope))
+        resid_std = np.sqrt(np.maximum(sse, 0.0) / np.maximum(nn - k, 1.0))
+        coef = np.concatenate([intercept[:, None, :], slope], axis=1)
+        return cls(list(sums.keys()), coef, resid_std, n.astype(np.int64))
+
+    def save(self, conn: sqlite3.Connection):
+        """기준선을 ambient_baseline 테이블에 저장합니다. (기존 기준선은 교체)"""
+        rows = [
+            (device_id, sensor, *self.coef[d, :, i].tolist(), float(self.resid_std[d, i]), int(self.sample_count[d]))
+            for d, device_id in enumerate(self.device_ids)
+            for i, sensor in enumerate(SENSOR_COLUMNS)
+        ]
+        conn.execute("DELETE FROM ambient_baseline;")
+        conn.executemany(f"""
+            INSERT INTO ambient_baseline (device_id, sensor, intercept, {', '.join(AMBIENT_COLUMNS)}, resid_std, sample_count)
+            VALUES ({', '.join('?' * (5 + len(AMBIENT_COLUMNS)))})
+        """, rows)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection):
+        """ambient_baseline 테이블에서 기준선을 불러옵니다."""
+        df = pd.read_sql_query("SELECT * FROM ambient_baseline ORDER BY device_id;", conn)
+        k, s = 1 + len(AMBIENT_COLUMNS), len(SENSOR_COLUMNS)
+        if df.empty:
+            return cls([], np.empty((0, k, s)), np.empty((0, s)), np.empty(0, dtype=np.int64))
+
+        device_ids = df['device_id'].unique()
+        sensor_pos = df['sensor'].map({sensor: i for i, sensor in enumerate(SENSOR_COLUMNS)}).to_numpy()
+        device_pos = pd.Index(device_ids).get_indexer(df['device_id'])
+        coef = np.full((len(device_ids), k, s), np.nan)
+        resid_std = np.full((len(device_ids), s), np.nan)
+        coef[device_pos, :, sensor_pos] = df[['intercept'] + AMBIENT_COLUMNS].to_numpy(dtype=np.float64)
+        resid_std[device_pos, sensor_pos] = df['resid_std'].to_numpy(dtype=np.float64)
+        sample_count = df.groupby('device_id', sort=False)['sample_count'].first().to_numpy()
+        return cls(device_ids, coef, resid_std, sample_count)
+
+    def score(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        레코드 배치의 센서별 잔차 z와 이상 점수(최대 |z|), 점수를 결정한 센서를 반환합니다.
+        기준선이 없는 장비나 외부 환경 값이 빠진 레코드의 점수는 NaN입니다.
+        """
+        pos = self.device_ids.get_indexer(frame['device_id'])
+        known = pos >= 0
+        x = _design_matrix(frame)
+        y = frame[SENSOR_COLUMNS].to_numpy(dtype=np.float64)
+
+        z = np.full(y.shape, np.nan)
+        if known.any():
+            coef = self.coef[pos[known]]
+            # 잔차 표준편차가 0인 센서(값이 항상 일정)는 점수에서 제외
+            std = np.where(self.resid_std[pos[known]] > 0, self.resid_std[pos[known]], np.nan)
+            predicted = np.einsum('nk,nks->ns', x[known], coef)
+            z[known] = (y[known] - predicted) / std
+
+        abs_z = np.abs(z)
+        has_score = ~np.isnan(abs_z).all(axis=1)
+        top = np.where(has_score, np.argmax(np.where(np.isnan(abs_z), -np.inf, abs_z), axis=1), -1)
+        result = frame[['record_id', 'device_id', 'collection_date', 'collection_time']].copy()
+        result['score'] = np.where(has_score, abs_z[np.arange(len(abs_z)), top], np.nan)
+        result['top_sensor'] = np.where(has_score, np.array(SENSOR_COLUMNS, dtype=object)[top], None)
+        for i, col in enumerate(Z_COLUMNS):
+            result[col] = z[:, i]
+        return result
+
+def update_ambient_scores(conn: sqlite3.Connection, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    마지막 갱신 이후 새로 적재된 레코드만 청크 단위로 점수를 계산하여 ambient_score에 저장합니다.
+    장비별로 처리한 마지막 record_id를 ambient_score_progress에 기록하고, 저장한 레코드 수를 반환합니다.
+    """
+    baseline = AmbientBaseline.load(conn)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT sr.device_id, COALESCE(p.last_record_id, 0)
+        FROM sensor_record sr
+        LEFT JOIN ambient_score_progress p ON sr.device_id = p.device_id
+        GROUP BY sr.device_id
+        HAVING MAX(sr.record_id) > COALESCE(p.last_record_id, 0);
+    """)
+    scored = 0
+    for device_id, last_record_id in cur.fetchall():
+        for chunk in pd.read_sql_query(RECORD_QUERY, conn, params=(device_id, last_record_id), chunksize=chunk_size):
+            scores = baseline.score(chunk)
+            scores = scores.astype(object).where(scores.notna(), None)
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO ambient_score (
+                    record_id, device_id, collection_date, collection_time, score, top_sensor, {', '.join(Z_COLUMNS)}
+                ) VALUES ({', '.join('?' * (6 + len(Z_COLUMNS)))})
+            """, scores.itertuples(index=False, name=None))
+            last_record_id = int(chunk['record_id'].max())
+            scored += len(chunk)
+        conn.execute("""
+            INSERT OR REPLACE INTO ambient_score_progress (device_id, last_record_id) VALUES (?, ?)
+        """, (device_id, last_record_id))
+    return scored
+
+def rebuild_ambient_scores(conn: sqlite3.Connection, min_samples: int = MIN_SAMPLES,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """기준선을 다시 학습하고 모든 레코드의 점수를 다시 계산합니다."""
+    create_ambient_tables(conn)
+    AmbientBaseline.fit(conn, min_samples, chunk_size).save(conn)
+    conn.execute("DELETE FROM ambient_score;")
+    conn.execute("DELETE FROM ambient_score_progress;")
+    return update_ambient_scores(conn, chunk_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="외부 환경 보정 기준선 학습 및 이상 점수 계산")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로")
+    parser.add_argument("--refit", action="store_true", help="기준선을 다시 학습하고 전체 점수를 다시 계산")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES, help="장비별 기준선 학습에 필요한 최소 레코드 수")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="한 번에 읽을 레코드 수")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    create_ambient_tables(conn)
+    # 파티션으로 분리된 과거 레코드도 함께 학습/점수 계산
+    attach_partitions(conn)
+    if args.refit:
+        scored = rebuild_ambient_scores(conn, args.min_samples, args.chunk_size)
+    else:
+        scored = update_ambient_scores(conn, args.chunk_size)
+    conn.commit()
+    devices = conn.execute("SELECT COUNT(DISTINCT device_id) FROM ambient_baseline;").fetchone()[0]
+    conn.close()
+    print(f"기준선 장비 수: {devices}, 점수를 계산한 레코드 수: {scored}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# 차트 생성 방식별 figure JSON 크기와 생성/직렬화/렌더링 시간을 비교합니다.
+#
+# 실행 (프로젝트 루트에서):
+#     python benchmarks/chart_payload.py                 # DB의 첫 번째 장비 데이터 사용
+#     python benchmarks/chart_payload.py --device agv03
+#     python benchmarks/chart_payload.py --synthetic 50000
+#
+# 렌더링 시간은 kaleido가 설치되어 있을 때만 측정합니다 (브라우저 렌더링의 근사치).
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import build_line_chart, configure_xaxis
+
+CT_COLUMNS = ['CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
+
+def load_frame(device_id: str = None, synthetic: int = 0) -> pd.DataFrame:
+    if synthetic:
+        rng = np.random.default_rng(0)
+        timestamps = pd.Timestamp("2024-08-26") + pd.to_timedelta(np.sort(rng.integers(0, 60 * 86400, synthetic)), unit='s')
+        df = pd.DataFrame({col: rng.normal(5, 1, synthetic) for col in CT_COLUMNS})
+        df.insert(0, 'timestamp', timestamps)
+        return df
+
+    from data_access import get_device_list, get_sensor_data_by_device
+    if device_id is None:
+        device_id = get_device_list()['device_id'].iloc[0]
+    return get_sensor_data_by_device(device_id)
+
+def before(df: pd.DataFrame):
+    # 기존 방식: px.line + 문자열 timestamp_label + category 축
+    df = df.copy()
+    df['timestamp_label'] = df['timestamp'].dt.strftime('%m-%d %H:%M')
+    fig = px.line(df, x='timestamp_label', y=CT_COLUMNS, title='before',
+                  labels={'value': '전류 (A)', 'variable': '센서 종류', 'timestamp_label': '측정 시점'})
+    return configure_xaxis(fig)
+
+def after(df: pd.DataFrame):
+    # 개선 방식: Scattergl + 측정 순서 축 + 숫자 배열
+    return build_line_chart(df, y=CT_COLUMNS, title='after',
+                            labels={'value': '전류 (A)', 'variable': '센서 종류', 'timestamp': '측정 시점'})
+
+def measure(name: str, build, df: pd.DataFrame, repeat: int):
+    build_times, json_times = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fig = build(df)
+        t1 = time.perf_counter()
+        payload = pio.to_json(fig, validate=False)
+        t2 = time.perf_counter()
+        build_times.append(t1 - t0)
+        json_times.append(t2 - t1)
+
+    render_time = None
+    try:
+        t0 = time.perf_counter()
+        fig.to_image(format='png')
+        render_time = time.perf_counter() - t0
+    except Exception:
+        pass
+
+    return {
+        'method': name,
+        'points': len(df) * len(CT_COLUMNS),
+        'payload_kb': len(payload.encode()) / 1024,
+        'build_ms': 1000 * min(build_times),
+        'to_json_ms': 1000 * min(json_times),
+        'render_ms': 1000 * render_time if render_time is not None else np.nan,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="차트 payload/렌더링 벤치마크")
+    parser.add_argument("--device", default=None, help="측정할 장비 ID (기본값: 첫 번째 장비)")
+    parser.add_argument("--synthetic", type=int, default=0, help="DB 대신 사용할 합성 데이터 행 수")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = load_frame(args.device, args.synthetic)
+    report = pd.DataFrame([
+        measure('px.line + category', before, df, args.repeat),
+        measure('Scattergl + ordinal', after, df, args.repeat),
+    ])
+    print(report.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+
+if __name__ == "__main__":
+    main()
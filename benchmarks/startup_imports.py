@@ -0,0 +1,53 @@
+# 대시보드 페이지가 사용하는 모듈의 콜드 import 시간을 새 프로세스에서 측정합니다.
+# (plotly.express처럼 첫 화면 전에 불러오지 않도록 미룬 모듈의 비용을 확인하는 용도)
+#
+# 실행 (프로젝트 루트에서):
+#     python benchmarks/startup_imports.py
+#     python benchmarks/startup_imports.py --repeat 5 --modules pandas plotly.express
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    'streamlit',
+    'pandas',
+    'numpy',
+    'plotly.graph_objects',
+    'plotly.express',
+    'query_client',
+    'prefetch',
+    'utils',
+    'similarity_index',
+]
+
+SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+def cold_import_seconds(module: str, repeat: int) -> float:
+    """새 인터프리터에서 모듈을 import하는 데 걸린 시간 중 최솟값(초)을 반환합니다."""
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return float('nan')
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="모듈별 콜드 import 시간 측정")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'module':<24}{'cold import (ms)':>18}")
+    for module in args.modules:
+        seconds = cold_import_seconds(module, args.repeat)
+        print(f"{module:<24}{seconds * 1000:>18,.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# 환경 변수 COMPACT_FRAMES=1 이면 캐시에 보관하는 장비 데이터를 압축 표현으로 변환
+COMPACT_FRAMES = os.environ.get("COMPACT_FRAMES", "0") == "1"
+
+# 범주형으로 변환할 문자열 컬럼
+CATEGORY_COLUMNS = ['device_id', 'device_name']
+# 센서/외부 환경 측정값 컬럼 (float32로 변환)
+FLOAT_COLUMNS = [
+    'PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value',
+    'CT1_value', 'CT2_value', 'CT3_value', 'CT4_value',
+    'ex_temperature', 'ex_humidity', 'ex_illuminance',
+]
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    data_access가 반환한 데이터프레임을 메모리 사용량이 적은 형태로 변환합니다.
+    - 센서 측정값: float64 → float32
+    - device_id / device_name: object → category
+    - annotation_state: 문자열 → int8 상태 코드 (0: 정상 ~ 3: 위험)
+    - timestamp: datetime64 유지 (x축 레이블 문자열은 저장하지 않음)
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if 'annotation_state' in df.columns:
+        df['annotation_state'] = pd.to_numeric(df['annotation_state'], errors='coerce').fillna(-1).astype(np.int8)
+    if 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    return df
+
+def maybe_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """COMPACT_FRAMES 설정이 켜져 있을 때만 compact_frame을 적용합니다."""
+    return compact_frame(df) if COMPACT_FRAMES else df
+
+def memory_footprint(df: pd.DataFrame) -> pd.DataFrame:
+    """컬럼별 dtype과 메모리 사용량(bytes, 문자열 포함)을 반환합니다."""
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage})
+
+def footprint_report(frames: dict) -> pd.DataFrame:
+    """
+    {이름: 데이터프레임} 목록에 대해 원본과 압축 표현의 메모리 사용량을 비교합니다.
+    """
+    rows = []
+    for name, df in frames.items():
+        original = int(df.memory_usage(deep=True).sum())
+        compact = int(compact_frame(df).memory_usage(deep=True).sum())
+        rows.append({
+            'frame': name,
+            'rows': len(df),
+            'original_bytes': original,
+            'compact_bytes': compact,
+            'ratio': compact / original if original else np.nan,
+        })
+    report = pd.DataFrame(rows, columns=['frame', 'rows', 'original_bytes', 'compact_bytes', 'ratio'])
+    if not report.empty:
+        total = report[['rows', 'original_bytes', 'compact_bytes']].sum()
+        report.loc[len(report)] = {
+            'frame': 'TOTAL',
+            'rows': total['rows'],
+            'original_bytes': total['original_bytes'],
+            'compact_bytes': total['compact_bytes'],
+            'ratio': total['compact_bytes'] / total['original_bytes'] if total['original_bytes'] else np.nan,
+        }
+    return report
+
+def column_report(df: pd.DataFrame) -> pd.DataFrame:
+    """한 데이터프레임의 컬럼별 원본/압축 dtype과 메모리 사용량을 나란히 비교합니다."""
+    return memory_footprint(df).join(memory_footprint(compact_frame(df)), lsuffix='_original', rsuffix='_compact')
+
+def main():
+    parser = argparse.ArgumentParser(description="원본/압축 데이터프레임 메모리 사용량 비교")
+    parser.add_argument("--device", default=None, help="지정한 장비의 컬럼별 메모리 사용량을 출력 (기본값: 전체 장비 요약)")
+    args = parser.parse_args()
+
+    from data_access import get_device_list, get_sensor_data_by_device, get_external_data_by_device
+
+    pd.set_option('display.max_rows', None)
+    if args.device:
+        for name, loader in (('sensor', get_sensor_data_by_device), ('external', get_external_data_by_device)):
+            print(f"[{name}:{args.device}]")
+            print(column_report(loader(args.device)).to_string())
+        return
+
+    # 전체 장비 데이터를 불러와 메모리 사용량 비교 리포트를 출력
+    frames = {}
+    for device_id in get_device_list()['device_id']:
+        frames[f"sensor:{device_id}"] = get_sensor_data_by_device(device_id)
+        frames[f"external:{device_id}"] = get_external_data_by_device(device_id)
+    print(footprint_report(frames).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
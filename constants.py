@@ -0,0 +1,5 @@
+# 대시보드와 배치 스크립트가 함께 사용하는 상수 (streamlit 등 UI 의존성 없이 불러올 수 있도록 분리)
+
+# 장비 상태 매핑 및 색상 정의
+STATE_MAP = {0: '정상', 1: '주의', 2: '경고', 3: '위험'}
+COLOR_MAP = {'정상': 'green', '주의': 'yellow', '경고': 'orange', '위험': 'red'}
@@ -1,4 +1,8 @@
 import streamlit as st
+from startup import PaintTimer, ensure_warm_up
+
+# pandas 등 이후 import 비용까지 첫 화면 표시 시간에 포함
+paint_timer = PaintTimer("dashboard")
 
 st.set_page_config(
     page_title="예지보전 대시보드",
@@ -6,6 +10,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# 서버 프로세스에서 한 번만 DB 페이지 캐시와 장비 목록/최신 상태 캐시를 준비
+ensure_warm_up()
+
 st.title("🏭 예지보전 대시보드")
 
 st.sidebar.success("분석할 메뉴를 선택하세요.")
@@ -24,3 +31,5 @@ st.markdown(
     - **데이터 분석:** 센서 데이터 간의 관계를 분석하여 이상 원인 탐색을 지원합니다.
 """
 )
+
+paint_timer.mark_paint()
@@ -1,22 +1,128 @@
+import logging
 import sqlite3
 import pandas as pd
 
+from state_episode import MAX_GAP_SECONDS
+
 DB_PATH = "db/sensor_data.sqlite"
 
-def get_db_connection():
-    """데이터베이스 연결을 생성하고 반환합니다."""
-    conn = sqlite3.connect(DB_PATH)
+# 기간별 파티션 파일로 분리되는 원본 테이블 (retention.py 참고)
+PARTITIONED_TABLES = ('sensor_record', 'external_data', 'ir_data')
+# sensor_record의 센서 측정값 컬럼 (집계 테이블, 리포트, 페이지에서 공통으로 사용)
+SENSOR_COLUMNS = ['PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value', 'CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
+# SQLite가 한 연결에 ATTACH할 수 있는 최대 DB 수 (SQLITE_MAX_ATTACHED 기본값)
+MAX_ATTACHED = 10
+
+logger = logging.getLogger(__name__)
+
+def _connect(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
+def get_db_connection(start_date: str = None, end_date: str = None, with_partitions: bool = True):
+    """
+    데이터베이스 연결을 생성하고 반환합니다.
+    파티션이 있으면 조회 기간(MM-DD)에 걸치는 파티션 파일만 ATTACH하고,
+    원본 테이블과 같은 이름의 TEMP VIEW로 합쳐서 기존 쿼리를 그대로 사용할 수 있게 합니다.
+    파티션 대상 테이블을 읽지 않는 조회는 with_partitions=False로 ATTACH를 생략합니다.
+    걸치는 파티션이 MAX_ATTACHED개를 넘을 수 있으면 partitioned_connections를 사용하세요.
+    """
+    conn = _connect()
+    if with_partitions:
+        attach_partitions(conn, start_date, end_date)
+    return conn
+
+def find_partitions(conn, start_date: str = None, end_date: str = None):
+    """partition_catalog에서 기간(MM-DD)에 걸치는 파티션의 (period, path)를 기간 순서로 반환합니다."""
+    if not _has_table(conn, 'partition_catalog'):
+        return []
+    return conn.execute("""
+        SELECT period, path FROM partition_catalog
+        WHERE (? IS NULL OR max_date >= ?) AND (? IS NULL OR min_date <= ?)
+        ORDER BY period;
+    """, (start_date, start_date, end_date, end_date)).fetchall()
+
+def attach_partitions(conn, start_date: str = None, end_date: str = None, partitions=None, include_main: bool = True):
+    """
+    기간(MM-DD)에 걸치는 파티션(또는 지정한 partitions)을 ATTACH하고 원본 테이블 이름의 TEMP VIEW를 만듭니다.
+    include_main=False이면 뷰에 main 테이블을 포함하지 않습니다. (partitioned_connections 참고)
+    기간을 지정했는데 걸치는 파티션이 MAX_ATTACHED개를 넘으면 ValueError를 발생시키고,
+    기간을 지정하지 않았으면 최근 MAX_ATTACHED개 파티션만 연결합니다.
+    """
+    if partitions is None:
+        partitions = find_partitions(conn, start_date, end_date)
+    if not partitions:
+        return
+    if len(partitions) > MAX_ATTACHED:
+        if start_date is not None or end_date is not None:
+            raise ValueError(
+                f"조회 기간({start_date} ~ {end_date})에 걸치는 파티션이 {len(partitions)}개로, "
+                f"SQLite가 한 번에 연결할 수 있는 {MAX_ATTACHED}개를 넘습니다. partitioned_connections로 나누어 조회하세요."
+            )
+        logger.warning("파티션 %d개 중 최근 %d개만 연결합니다. 이전 기간은 기간을 지정하여 조회하세요.",
+                       len(partitions), MAX_ATTACHED)
+        partitions = partitions[-MAX_ATTACHED:]
+
+    schemas = []
+    for period, path in partitions:
+        schema = f"p_{period}"
+        conn.execute(f"ATTACH DATABASE ? AS {schema};", (path,))
+        schemas.append(schema)
+    # TEMP 스키마가 main보다 먼저 조회되므로 같은 이름의 뷰가 원본 테이블을 대신합니다.
+    # 압축 작업은 파티션에 복사를 커밋한 뒤 main에서 삭제하므로, 그 사이에 양쪽에 있는 레코드는 main 쪽만 사용합니다.
+    # (세 테이블을 같은 트랜잭션으로 옮기므로 main.sensor_record의 기본 키로 모두 판별)
+    for table in PARTITIONED_TABLES:
+        union = " UNION ALL ".join(([f"SELECT * FROM main.{table}"] if include_main else []) + [
+            f"SELECT * FROM {schema}.{table} AS t "
+            f"WHERE NOT EXISTS (SELECT 1 FROM main.sensor_record AS m WHERE m.record_id = t.record_id)"
+            for schema in schemas
+        ])
+        conn.execute(f"CREATE TEMP VIEW {table} AS {union};")
+
+def partitioned_connections(start_date: str = None, end_date: str = None, db_path: str = DB_PATH):
+    """
+    기간(MM-DD)에 걸치는 파티션을 MAX_ATTACHED개씩 나누어 연결한 연결을 차례로 반환(yield)합니다.
+    main 테이블은 첫 연결의 뷰에만 포함하므로, 각 연결에서 같은 쿼리를 실행한 결과를 합치면 레코드가 한 번씩만 나옵니다.
+    이전 연결은 다음 연결을 만들기 전에 닫습니다.
+    """
+    conn = _connect(db_path)
+    try:
+        partitions = find_partitions(conn, start_date, end_date)
+        groups = [partitions[i:i + MAX_ATTACHED] for i in range(0, len(partitions), MAX_ATTACHED)] or [[]]
+        for i, group in enumerate(groups):
+            if i > 0:
+                conn.close()
+                conn = _connect(db_path)
+            attach_partitions(conn, partitions=group, include_main=(i == 0))
+            yield conn
+    finally:
+        conn.close()
+
+def _read_partitioned(query: str, params=(), start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """partitioned_connections의 연결마다 같은 쿼리를 실행하고 결과를 합칩니다."""
+    frames = [pd.read_sql_query(query, conn, params=params) for conn in partitioned_connections(start_date, end_date)]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+def _date_range_clause(alias: str, start_date: str = None, end_date: str = None):
+    """collection_date(MM-DD) 기간 조건과 매개변수를 반환합니다."""
+    clause, params = "", []
+    if start_date is not None:
+        clause += f" AND {alias}collection_date >= ?"
+        params.append(start_date)
+    if end_date is not None:
+        clause += f" AND {alias}collection_date <= ?"
+        params.append(end_date)
+    return clause, params
+
 def get_overall_equipment_status():
     """
     모든 장비의 가장 최신 상태 정보를 가져옵니다.
     각 device_id 별로 가장 마지막 record_id의 데이터를 조회합니다.
     """
-    conn = get_db_connection()
     query = """
     SELECT
+        sr.record_id,
         sr.device_id,
         di.device_name,
         sr.annotation_state,
@@ -30,22 +136,40 @@ def get_overall_equipment_status():
     ) latest ON sr.device_id = latest.device_id AND sr.record_id = latest.max_record_id
     JOIN device_info di ON sr.device_id = di.device_id;
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    # 파티션을 나누어 조회하면 연결마다 장비별 최신 레코드가 나오므로 그중 가장 마지막 레코드만 남김
+    df = _read_partitioned(query)
+    df = df.sort_values('record_id').drop_duplicates('device_id', keep='last')
+    return df.drop(columns='record_id').reset_index(drop=True)
 
 def get_device_list():
     """전체 장비 목록을 가져옵니다."""
-    conn = get_db_connection()
+    conn = get_db_connection(with_partitions=False)
     query = "SELECT device_id, device_name FROM device_info ORDER BY device_name;"
     df = pd.read_sql_query(query, conn)
     conn.close()
     return df
 
-def get_sensor_data_by_device(device_id: str):
-    """특정 장비의 시계열 센서 데이터를 가져옵니다. (보안 및 안정성 강화 버전)"""
-    conn = get_db_connection()
-    query = """
+def get_date_bounds():
+    """
+    조회할 수 있는 원본 센서 데이터의 첫 날짜와 마지막 날짜(MM-DD)를 가져옵니다.
+    메인 DB와 partition_catalog에 기록된 파티션 기간을 함께 봅니다.
+    """
+    conn = get_db_connection(with_partitions=False)
+    union = "SELECT MIN(collection_date) AS min_date, MAX(collection_date) AS max_date FROM sensor_record"
+    if _has_table(conn, 'partition_catalog'):
+        union += " UNION ALL SELECT MIN(min_date), MAX(max_date) FROM partition_catalog"
+    query = f"SELECT MIN(min_date) AS min_date, MAX(max_date) AS max_date FROM ({union});"
+    df = pd.read_sql_query(query, conn)
+    conn.close()
+    return df
+
+def get_sensor_data_by_device(device_id: str, start_date: str = None, end_date: str = None):
+    """
+    특정 장비의 시계열 센서 데이터를 가져옵니다. (보안 및 안정성 강화 버전)
+    start_date / end_date(MM-DD)를 지정하면 해당 기간의 파티션만 조회합니다.
+    """
+    date_clause, date_params = _date_range_clause("", start_date, end_date)
+    query = f"""
     SELECT
         record_id,
         collection_date || ' ' || collection_time as timestamp,
@@ -54,14 +178,13 @@ def get_sensor_data_by_device(device_id: str):
         CT1_value, CT2_value, CT3_value, CT4_value,
         annotation_state
     FROM sensor_record
-    WHERE device_id = ?
+    WHERE device_id = ?{date_clause}
     ORDER BY collection_date ASC, collection_time ASC;
     """
     # SQL Injection을 방지하기 위해 매개변수화된 쿼리 사용
-    df = pd.read_sql_query(query, conn, params=(device_id,))
+    df = _read_partitioned(query, (device_id, *date_params), start_date, end_date)
     
     if df.empty:
-        conn.close()
         return pd.DataFrame()
 
     # 날짜 형식 변환 및 오류 처리
@@ -74,12 +197,11 @@ def get_sensor_data_by_device(device_id: str):
     # datetime 객체 기준으로 최종 정렬하여 순서 보장
     df.sort_values(by='timestamp', inplace=True)
 
-    conn.close()
     return df
 
-def get_external_data_by_device(device_id: str):
+def get_external_data_by_device(device_id: str, start_date: str = None, end_date: str = None):
     """특정 장비의 외부 환경 데이터를 가져옵니다."""
-    conn = get_db_connection()
+    date_clause, date_params = _date_range_clause("sr.", start_date, end_date)
     # 이 쿼리는 sensor_record와 external_data를 조인하여 특정 장비의 외부 데이터를 가져옵니다.
     # external_data는 record_id를 기준으로 sensor_record와 연결됩니다.
     query = f"""
@@ -90,25 +212,24 @@ def get_external_data_by_device(device_id: str):
         ed.value
     FROM external_data ed
     JOIN sensor_record sr ON ed.record_id = sr.record_id
-    WHERE sr.device_id = '{device_id}'
+    WHERE sr.device_id = ?{date_clause}
     ORDER BY timestamp ASC;
     """
-    df = pd.read_sql_query(query, conn)
+    df = _read_partitioned(query, (device_id, *date_params), start_date, end_date)
     df['timestamp'] = pd.to_datetime(df['timestamp'], format='%m-%d %H:%M:%S', errors='coerce')
     df.dropna(subset=['timestamp'], inplace=True)
     # 연도를 2024년으로 강제 설정
     df['timestamp'] = df['timestamp'].apply(lambda dt: dt.replace(year=2024))
     # Pivot the table to have sensor types as columns
     df_pivot = df.pivot_table(index='timestamp', columns='sensor_type', values='value').reset_index()
-    conn.close()
     return df_pivot
 
-def get_sensor_data_for_devices(device_ids: list[str]):
+def get_sensor_data_for_devices(device_ids: list[str], start_date: str = None, end_date: str = None):
     """선택된 여러 장비의 시계열 센서 데이터를 가져옵니다."""
     if not device_ids:
         return pd.DataFrame()
 
-    conn = get_db_connection()
+    date_clause, date_params = _date_range_clause("sr.", start_date, end_date)
     # SQL의 IN 연산자에 맞게 device_ids 리스트를 튜플 형태로 변환
     device_ids_tuple = tuple(device_ids)
     placeholders = ', '.join('?' * len(device_ids_tuple))
@@ -123,13 +244,172 @@ def get_sensor_data_for_devices(device_ids: list[str]):
         sr.CT1_value, sr.CT2_value, sr.CT3_value, sr.CT4_value
     FROM sensor_record sr
     JOIN device_info di ON sr.device_id = di.device_id
-    WHERE sr.device_id IN ({placeholders})
+    WHERE sr.device_id IN ({placeholders}){date_clause}
     ORDER BY sr.device_id, timestamp ASC;
     """
-    df = pd.read_sql_query(query, conn, params=device_ids_tuple)
+    df = _read_partitioned(query, (*device_ids_tuple, *date_params), start_date, end_date)
     df['timestamp'] = pd.to_datetime(df['timestamp'], format='%m-%d %H:%M:%S', errors='coerce')
     df.dropna(subset=['timestamp'], inplace=True)
     df['timestamp'] = df['timestamp'].apply(lambda dt: dt.replace(year=2024))
+    # 파티션을 나누어 조회한 결과를 합쳤으므로 장비/시각 순서를 다시 맞춤
+    df.sort_values(['device_id', 'timestamp'], kind='stable', inplace=True, ignore_index=True)
+    return df
+
+
+def _read_state_episodes(conn, device_id: str = None):
+    """state_episode 테이블을 읽어 시작/종료 시각과 체류 시간을 계산합니다."""
+    query = """
+    SELECT device_id, state, start_ts, end_ts, record_count
+    FROM state_episode
+    """
+    params = ()
+    if device_id is not None:
+        query += " WHERE device_id = ?"
+        params = (device_id,)
+    query += " ORDER BY device_id, start_ts ASC;"
+    df = pd.read_sql_query(query, conn, params=params)
+    if df.empty:
+        return df
+
+    # 연도를 2024년으로 고정하여 변환 (collection_date는 'MM-DD' 형식)
+    df['start_ts'] = pd.to_datetime('2024-' + df['start_ts'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df['end_ts'] = pd.to_datetime('2024-' + df['end_ts'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df.dropna(subset=['start_ts', 'end_ts'], inplace=True)
+    df['state'] = df['state'].astype(int)
+    # 구간은 같은 장비의 다음 구간이 시작될 때까지 유지된 것으로 봅니다.
+    # (마지막 레코드 시각을 종료로 쓰면 체류 시간이 짧게 잡히고 레코드가 하나인 구간은 길이가 0이 됨)
+    # 다음 구간이 수집 공백(MAX_GAP_SECONDS 초과) 뒤에 시작하거나 없으면 마지막 레코드 시각을 종료 시각으로 사용합니다.
+    next_start = df.groupby('device_id')['start_ts'].shift(-1)
+    contiguous = (next_start - df['end_ts']) <= pd.Timedelta(seconds=MAX_GAP_SECONDS)
+    df['end_ts'] = next_start.where(contiguous, df['end_ts'])
+    df['duration'] = df['end_ts'] - df['start_ts']
+    df['prev_state'] = df.groupby('device_id')['state'].shift()
+    return df
+
+def get_state_episodes_by_device(device_id: str):
+    """특정 장비의 상태 구간(같은 상태가 연속된 구간) 목록을 가져옵니다."""
+    conn = get_db_connection(with_partitions=False)
+    df = _read_state_episodes(conn, device_id)
     conn.close()
     return df
 
+def get_fleet_state_statistics():
+    """전체 장비의 상태별 구간 수, 레코드 수, 체류 시간 통계를 가져옵니다."""
+    conn = get_db_connection(with_partitions=False)
+    df = _read_state_episodes(conn)
+    conn.close()
+    if df.empty:
+        return pd.DataFrame()
+
+    stats = df.groupby(['device_id', 'state']).agg(
+        episode_count=('state', 'size'),
+        record_count=('record_count', 'sum'),
+        total_dwell=('duration', 'sum'),
+        mean_dwell=('duration', 'mean'),
+        max_dwell=('duration', 'max'),
+    ).reset_index()
+    return stats
+
+def get_fleet_mtbf(failure_states: tuple[int, ...] = (3,)):
+    """
+    장비별 MTBF(평균 고장 간격)를 계산합니다.
+    failure_states 이외 상태로 관측된 가동 시간 합계를 failure_states 진입 횟수로 나눕니다.
+    구간 체류 시간에는 수집 공백이 포함되지 않으므로, 데이터가 없는 기간은 MTBF에 더해지지 않습니다.
+    """
+    conn = get_db_connection(with_partitions=False)
+    df = _read_state_episodes(conn)
+    conn.close()
+    if df.empty:
+        return pd.DataFrame()
+
+    in_failure = df['state'].isin(failure_states)
+    # 수집 공백으로 나뉜 같은 고장 상태 구간은 새 진입으로 세지 않음
+    df['failure_entry'] = in_failure & ~df['prev_state'].isin(failure_states)
+    df['uptime'] = df['duration'].where(~in_failure, pd.Timedelta(0))
+    mtbf = df.groupby('device_id').agg(
+        failure_count=('failure_entry', 'sum'),
+        uptime=('uptime', 'sum'),
+    )
+    mtbf['mtbf'] = mtbf['uptime'] / mtbf['failure_count'].where(mtbf['failure_count'] > 0)
+    mtbf['last_failure'] = df[df['failure_entry']].groupby('device_id')['start_ts'].max()
+    mtbf['failure_count'] = mtbf['failure_count'].astype(int)
+    return mtbf[['failure_count', 'mtbf', 'last_failure']].reset_index()
+
+def _has_table(conn, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (table,)).fetchone() is not None
+
+def get_ambient_scores_by_device(device_id: str, start_date: str = None, end_date: str = None):
+    """
+    특정 장비의 레코드별 환경 보정 이상 점수를 가져옵니다. (ambient_baseline.py에서 미리 계산하여 저장한 값)
+    score는 센서별 잔차 z 중 절댓값이 가장 큰 값이고, top_sensor는 그 센서입니다.
+    """
+    conn = get_db_connection(with_partitions=False)
+    if not _has_table(conn, 'ambient_score'):
+        conn.close()
+        return pd.DataFrame()
+    date_clause, date_params = _date_range_clause("", start_date, end_date)
+    query = f"""
+    SELECT
+        record_id,
+        collection_date || ' ' || collection_time as timestamp,
+        score, top_sensor,
+        PM10_z, PM2_5_z, PM1_0_z, NTC_z
+    FROM ambient_score
+    WHERE device_id = ? AND score IS NOT NULL{date_clause}
+    ORDER BY collection_date ASC, collection_time ASC;
+    """
+    df = pd.read_sql_query(query, conn, params=(device_id, *date_params))
+    conn.close()
+    df['timestamp'] = pd.to_datetime('2024-' + df['timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df.dropna(subset=['timestamp'], inplace=True)
+    return df
+
+def get_fleet_ambient_scores(threshold: float = 3.0):
+    """장비별 최신 환경 보정 이상 점수, 최대 점수, 기준(threshold) 초과 비율(%)을 가져옵니다."""
+    conn = get_db_connection(with_partitions=False)
+    if not _has_table(conn, 'ambient_score'):
+        conn.close()
+        return pd.DataFrame()
+    query = """
+    SELECT
+        s.device_id,
+        s.score AS latest_score,
+        s.top_sensor AS latest_top_sensor,
+        agg.max_score,
+        agg.anomaly_rate,
+        agg.scored_count
+    FROM ambient_score s
+    JOIN (
+        SELECT
+            device_id,
+            MAX(record_id) AS max_record_id,
+            MAX(score) AS max_score,
+            AVG(CASE WHEN score > ? THEN 1.0 ELSE 0.0 END) * 100 AS anomaly_rate,
+            COUNT(*) AS scored_count
+        FROM ambient_score
+        WHERE score IS NOT NULL
+        GROUP BY device_id
+    ) agg ON s.record_id = agg.max_record_id
+    ORDER BY s.score DESC;
+    """
+    df = pd.read_sql_query(query, conn, params=(threshold,))
+    conn.close()
+    return df
+
+def get_sensor_aggregates_by_device(device_id: str, resolution: str = 'hourly'):
+    """
+    보존 기간이 지나 원본이 삭제된 구간의 시간별/일별 집계 데이터를 가져옵니다.
+    resolution: 'hourly' 또는 'daily'
+    """
+    table = {'hourly': 'sensor_hourly', 'daily': 'sensor_daily'}[resolution]
+    conn = get_db_connection(with_partitions=False)
+    if not _has_table(conn, table):
+        conn.close()
+        return pd.DataFrame()
+    df = pd.read_sql_query(f"SELECT * FROM {table} WHERE device_id = ? ORDER BY bucket ASC;", conn, params=(device_id,))
+    conn.close()
+    if df.empty:
+        return df
+    fmt = '%Y-%m-%d %H' if resolution == 'hourly' else '%Y-%m-%d'
+    df['timestamp'] = pd.to_datetime('2024-' + df['bucket'], format=fmt, errors='coerce')
+    return df
@@ -0,0 +1,197 @@
+# 전체 장비의 기간별 요약 리포트를 생성하는 배치 작업입니다.
+#
+# 장비별로 sensor_record / external_data / ir_data를 한 번씩 순차 스트리밍하며 요약 통계를 누적하고,
+# 이상 전류 기준을 구한 뒤 CT 값만 한 번 더 스트리밍하여 기준 초과 건수를 셉니다.
+# 장비 단위로 워커 프로세스에 나누어 병렬 처리하며, 메모리 사용량은 장비 수 및 기간과 무관하게
+# 워커 수 × 청크 크기로 제한됩니다. DB를 변경하지 않으며 조인에 필요한 인덱스는 적재 스크립트가 생성합니다.
+#
+# 실행:
+#     python fleet_report.py --start 10-21 --end 10-27 --format csv html
+import argparse
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_access import DB_PATH, SENSOR_COLUMNS, partitioned_connections
+from constants import STATE_MAP
+
+CT_COLUMNS = ['CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
+EXTERNAL_COLUMNS = ['ex_temperature', 'ex_humidity', 'ex_illuminance']
+STAT_COLUMNS = SENSOR_COLUMNS + EXTERNAL_COLUMNS + ['value_TGmx']
+
+# 이상 전류 기준: 평균 + k × 표준편차 (notebooks/지표 설계.ipynb 참고)
+DEFAULT_STD_SCALE = 3.0
+DEFAULT_CHUNK_SIZE = 5000
+OUTPUT_FORMATS = ('csv', 'parquet', 'html')
+
+DEVICE_QUERY = f"""
+SELECT
+    sr.collection_date || ' ' || sr.collection_time AS ts,
+    sr.annotation_state,
+    {', '.join('sr.' + col for col in SENSOR_COLUMNS)},
+    et.value AS ex_temperature,
+    eh.value AS ex_humidity,
+    ei.value AS ex_illuminance,
+    ir.value_TGmx
+FROM sensor_record sr
+LEFT JOIN external_data et ON et.record_id = sr.record_id AND et.sensor_type = 'ex_temperature'
+LEFT JOIN external_data eh ON eh.record_id = sr.record_id AND eh.sensor_type = 'ex_humidity'
+LEFT JOIN external_data ei ON ei.record_id = sr.record_id AND ei.sensor_type = 'ex_illuminance'
+LEFT JOIN ir_data ir ON ir.record_id = sr.record_id
+WHERE sr.device_id = ? AND sr.collection_date BETWEEN ? AND ?
+"""
+
+CT_QUERY = f"""
+SELECT {', '.join(CT_COLUMNS)}
+FROM sensor_record
+WHERE device_id = ? AND collection_date BETWEEN ? AND ?
+"""
+
+class RunningStats:
+    """컬럼별 개수, 합, 제곱합, 최소, 최대를 청크 단위로 누적합니다."""
+
+    def __init__(self, columns: list[str]):
+        n = len(columns)
+        self.columns = columns
+        self.count = np.zeros(n)
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+
+    def update(self, values: np.ndarray):
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        self.count += valid.sum(axis=0)
+        self.total += filled.sum(axis=0)
+        self.total_sq += (filled ** 2).sum(axis=0)
+        self.min = np.minimum(self.min, np.where(valid, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(valid, values, -np.inf).max(axis=0))
+
+    @property
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.total / self.count
+
+    @property
+    def std(self):
+        # 표본 표준편차 (pandas의 std와 동일하게 ddof=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.total_sq - self.count * self.mean ** 2) / (self.count - 1)
+        return np.sqrt(np.maximum(var, 0.0))
+
+def summarize_device(device_id: str, db_path: str = DB_PATH, start: str = '01-01', end: str = '12-31',
+                     std_scale: float = DEFAULT_STD_SCALE, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """한 장비의 기간 내 레코드를 청크 단위로 읽어 요약 통계 한 행(dict)을 반환합니다."""
+    stats = RunningStats(STAT_COLUMNS)
+    state_counts = np.zeros(len(STATE_MAP), dtype=np.int64)
+    records = 0
+    first_ts, last_ts = None, None
+
+    # 보존 정책으로 분리된 파티션 중 기간에 걸치는 파티션만 MAX_ATTACHED개씩 나누어 조회
+    for conn in partitioned_connections(start, end, db_path):
+        for chunk in pd.read_sql_query(DEVICE_QUERY, conn, params=(device_id, start, end), chunksize=chunk_size):
+            records += len(chunk)
+            stats.update(chunk[STAT_COLUMNS].to_numpy(dtype=np.float64))
+            states = pd.to_numeric(chunk['annotation_state'], errors='coerce').dropna().astype(int)
+            state_counts += np.bincount(states[states.between(0, len(STATE_MAP) - 1)].to_numpy(), minlength=len(STATE_MAP))
+            chunk_first, chunk_last = chunk['ts'].min(), chunk['ts'].max()
+            first_ts = chunk_first if first_ts is None else min(first_ts, chunk_first)
+            last_ts = chunk_last if last_ts is None else max(last_ts, chunk_last)
+
+    row = {'device_id': device_id, 'records': records, 'first_record': first_ts, 'last_record': last_ts}
+    for code, label in STATE_MAP.items():
+        row[f'state_{label}_count'] = int(state_counts[code])
+        row[f'state_{label}_ratio'] = state_counts[code] / records if records else np.nan
+
+    mean, std = stats.mean, stats.std
+    for i, col in enumerate(STAT_COLUMNS):
+        row[f'{col}_mean'] = mean[i]
+        row[f'{col}_std'] = std[i]
+        row[f'{col}_min'] = stats.min[i] if stats.count[i] else np.nan
+        row[f'{col}_max'] = stats.max[i] if stats.count[i] else np.nan
+
+    # 이상 전류 발생률 (%): CT별 기준 초과 비율, 그리고 CT1~CT4 중 하나라도 초과한 비율
+    # 기준(평균 + kσ)은 전체 기간 통계가 필요하므로, 통계를 누적한 뒤 CT 값만 다시 읽어 청크별로 초과 건수를 셈
+    if records:
+        ct_index = [STAT_COLUMNS.index(col) for col in CT_COLUMNS]
+        thresholds = mean[ct_index] + std_scale * std[ct_index]
+        abnormal = np.zeros(len(CT_COLUMNS), dtype=np.int64)
+        any_abnormal = 0
+        for conn in partitioned_connections(start, end, db_path):
+            for chunk in pd.read_sql_query(CT_QUERY, conn, params=(device_id, start, end), chunksize=chunk_size):
+                exceeded = chunk[CT_COLUMNS].to_numpy(dtype=np.float64) > thresholds
+                abnormal += exceeded.sum(axis=0)
+                any_abnormal += int(exceeded.any(axis=1).sum())
+        for i, col in enumerate(CT_COLUMNS):
+            row[f'{col}_abnormal_rate'] = abnormal[i] / records * 100
+        row['any_abnormal_current_rate'] = any_abnormal / records * 100
+    else:
+        for col in CT_COLUMNS:
+            row[f'{col}_abnormal_rate'] = np.nan
+        row['any_abnormal_current_rate'] = np.nan
+
+    # 열화상 최고 온도
+    row['thermal_max'] = row.pop('value_TGmx_max')
+    return row
+
+def build_fleet_report(db_path: str = DB_PATH, start: str = '01-01', end: str = '12-31', workers: int = None,
+                       std_scale: float = DEFAULT_STD_SCALE, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """전체 장비의 요약 리포트를 장비 단위 병렬 처리로 생성합니다."""
+    conn = sqlite3.connect(db_path)
+    device_ids = [row[0] for row in conn.execute("SELECT device_id FROM device_info ORDER BY device_id;")]
+    conn.close()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(summarize_device, device_id, db_path, start, end, std_scale, chunk_size)
+            for device_id in device_ids
+        ]
+        rows = [future.result() for future in futures]
+    return pd.DataFrame(rows)
+
+def write_report(report: pd.DataFrame, output_dir: str, formats, name: str = "fleet_report"):
+    """리포트를 지정한 형식(csv/parquet/html)으로 저장하고 저장한 경로 목록을 반환합니다."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        if fmt == 'csv':
+            report.to_csv(path, index=False, encoding='utf-8-sig')
+        elif fmt == 'parquet':
+            try:
+                report.to_parquet(path, index=False)
+            except ImportError as e:
+                print(f"Parquet 저장 실패 (pyarrow 또는 fastparquet 필요): {e}")
+                continue
+        elif fmt == 'html':
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"<html><head><meta charset='utf-8'><title>{name}</title></head><body>")
+                f.write(f"<h1>장비 요약 리포트 ({name})</h1>")
+                f.write(report.to_html(index=False, float_format=lambda v: f"{v:,.3f}", na_rep='-'))
+                f.write("</body></html>")
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="전체 장비 요약 리포트 생성")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로")
+    parser.add_argument("--start", default="01-01", help="시작일 (MM-DD)")
+    parser.add_argument("--end", default="12-31", help="종료일 (MM-DD)")
+    parser.add_argument("--format", nargs="+", default=["csv"], choices=OUTPUT_FORMATS, help="출력 형식")
+    parser.add_argument("--output-dir", default="reports", help="출력 폴더")
+    parser.add_argument("--workers", type=int, default=None, help="병렬 처리할 워커 프로세스 수")
+    parser.add_argument("--std-scale", type=float, default=DEFAULT_STD_SCALE, help="이상 전류 기준 표준편차 배수")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="한 번에 읽을 레코드 수")
+    args = parser.parse_args()
+
+    report = build_fleet_report(args.db, args.start, args.end, args.workers, args.std_scale, args.chunk_size)
+    name = f"fleet_report_{args.start}_{args.end}"
+    for path in write_report(report, args.output_dir, args.format, name):
+        print(f"저장 완료: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+# 원본 JSON의 센서 키 → DB 컬럼 접두어
+SENSOR_KEYS = {
+    'PM10': 'PM10', 'PM2.5': 'PM2_5', 'PM1.0': 'PM1_0', 'NTC': 'NTC',
+    'CT1': 'CT1', 'CT2': 'CT2', 'CT3': 'CT3', 'CT4': 'CT4',
+}
+EXTERNAL_SENSORS = ['ex_temperature', 'ex_humidity', 'ex_illuminance']
+
+DEVICE_FIELDS = [
+    'device_id', 'device_name', 'device_manufacturer',
+    'dust_sensor_manufacturer', 'dust_sensor_name',
+    'temp_sensor_manufacturer', 'temp_sensor_name',
+    'overcurrent_sensor_manufacturer', 'overcurrent_sensor_name',
+    'thermal_camera_sensor_manufacturer', 'thermal_camera_sensor_name',
+    'img_description',
+]
+RECORD_FIELDS = [
+    'filename', 'collection_date', 'collection_time', 'duration_time', 'sensor_types',
+    'cumulative_operating_day', 'equipment_history',
+]
+REQUIRED_FIELDS = ['device_id', 'filename', 'collection_date', 'collection_time']
+
+# 센서별 허용 범위 (물리적으로 불가능한 값을 걸러내기 위한 넉넉한 기준)
+VALUE_RANGES = {
+    'PM10_value': (0, 1000), 'PM2_5_value': (0, 1000), 'PM1_0_value': (0, 1000),
+    'NTC_value': (-40, 200),
+    'CT1_value': (0, 1000), 'CT2_value': (0, 1000), 'CT3_value': (0, 1000), 'CT4_value': (0, 1000),
+    'value_TGmx': (-40, 500),
+    'ex_temperature_value': (-40, 60),
+    'ex_humidity_value': (0, 100),
+    'ex_illuminance_value': (0, 200000),
+}
+VALID_STATES = ['0', '1', '2', '3']
+
+# 단위가 알려진 센서 (그 외 센서는 첫 배치의 최빈 단위를 기준으로 사용)
+KNOWN_UNITS = {
+    'CT1_unit': 'A', 'CT2_unit': 'A', 'CT3_unit': 'A', 'CT4_unit': 'A',
+    'ex_humidity_unit': '%',
+}
+UNIT_COLUMNS = [f"{col}_unit" for col in SENSOR_KEYS.values()] + [f"{name}_unit" for name in EXTERNAL_SENSORS]
+
+QUARANTINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_quarantine (
+    quarantine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    zip_path TEXT,
+    file TEXT,
+    reason TEXT,
+    document TEXT,
+    quarantined_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+class SchemaError(ValueError):
+    """원본 JSON에 필수 항목이 없거나 구조가 다를 때 발생합니다."""
+
+def _first(container, key: str, path: str):
+    try:
+        value = container[key]
+        return value[0] if isinstance(value, list) else value
+    except (KeyError, IndexError, TypeError):
+        raise SchemaError(f"schema: {path}.{key} 누락") from None
+
+def _item(values) -> dict:
+    """센서 값 목록의 첫 항목을 반환합니다. 값이 없으면 빈 dict를 반환하고, 목록이 아닌 단일 항목도 허용합니다."""
+    if isinstance(values, list):
+        values = values[0] if values else None
+    return values or {}
+
+def flatten_document(data: dict) -> dict:
+    """
+    원본 JSON 문서를 한 행(dict)으로 평탄화합니다.
+    필수 구조(meta_info, sensor_data, ir_data.temp_max, annotations.tagging, external_data)가 없으면 SchemaError를 발생시킵니다.
+    """
+    try:
+        return _flatten(data)
+    except (AttributeError, IndexError, KeyError, TypeError) as e:
+        raise SchemaError(f"schema: 항목 형식 오류 ({e})") from None
+
+def _flatten(data: dict) -> dict:
+    m = _first(data, "meta_info", "")
+    s = _first(data, "sensor_data", "")
+    ir = _first(_first(data, "ir_data", ""), "temp_max", "ir_data")
+    ann = _first(_first(data, "annotations", ""), "tagging", "annotations")
+    ext = _first(data, "external_data", "")
+    if not isinstance(m, dict) or not isinstance(s, dict) or not isinstance(ir, dict) or not isinstance(ann, dict) or not isinstance(ext, dict):
+        raise SchemaError("schema: 항목 형식 오류")
+
+    row = {field: m.get(field) for field in DEVICE_FIELDS + RECORD_FIELDS}
+    row['img_id'] = m.get("img-id")
+    row['location'] = m.get("location")
+    row['img_name'] = m.get("img_name")
+    row['annotation_type'] = ann.get("annotation_type")
+    row['annotation_state'] = ann.get("state")
+
+    for key, col in SENSOR_KEYS.items():
+        sensor = _item(s.get(key))
+        row[f"{col}_value"] = sensor.get("value")
+        row[f"{col}_unit"] = sensor.get("data_unit")
+        row[f"{col}_trend"] = sensor.get("trend")
+
+    row['value_TGmx'] = ir.get("value_TGmx")
+    row['X_Tmax'] = ir.get("X_Tmax")
+    row['Y_Tmax'] = ir.get("Y_Tmax")
+
+    for name in EXTERNAL_SENSORS:
+        e = _first(ext, name, "external_data")
+        row[f"{name}_value"] = e.get("value")
+        row[f"{name}_unit"] = e.get("data_unit")
+        row[f"{name}_trend"] = e.get("trend")
+    # 그 외 외부 센서도 external_data에 그대로 적재
+    row['external_items'] = [
+        (name, item.get("value"), item.get("data_unit"), item.get("trend"))
+        for name, item in ((name, _item(values)) for name, values in ext.items())
+    ]
+    return row
+
+class IngestValidator:
+    """
+    평탄화된 문서 배치를 벡터 연산으로 검증합니다.
+    (필수값, 날짜/시간 형식, 숫자 형식, 센서별 범위, 상태값, 단위 일관성, 중복 filename)
+    """
+
+    def __init__(self):
+        self.expected_units = dict(KNOWN_UNITS)
+        self.seen_filenames = set()
+        self.elapsed = 0.0
+        self.checked = 0
+        self.rejected = 0
+
+    def validate(self, df: pd.DataFrame):
+        """
+        배치를 검증하여 (정상 행 마스크, 행별 거부 사유 Series)를 반환합니다.
+        거부 사유는 ';'로 구분된 검사 항목 목록이며, 정상 행은 빈 문자열입니다.
+        """
+        start = time.perf_counter()
+        reasons = pd.Series("", index=df.index, dtype=object)
+
+        def reject(mask, label):
+            mask = np.asarray(mask, dtype=bool)
+            if mask.any():
+                reasons[mask] = reasons[mask] + label + ";"
+
+        # 1. 필수값 및 형식 (마스크는 numpy 배열로 결합하여 배치마다의 pandas 연산 비용을 줄임)
+        for col in REQUIRED_FIELDS:
+            reject(df[col].isna().to_numpy() | (df[col].astype(str).str.strip() == "").to_numpy(), f"missing:{col}")
+        reject(~df['collection_date'].astype(str).str.fullmatch(r"\d{2}-\d{2}"), "format:collection_date")
+        reject(~df['collection_time'].astype(str).str.fullmatch(r"\d{2}:\d{2}:\d{2}"), "format:collection_time")
+
+        # 2. 숫자 형식 및 센서별 범위 (센서 컬럼 전체를 한 번에 변환하고 2차원 마스크로 검사)
+        value_columns = list(VALUE_RANGES)
+        raw = df[value_columns]
+        missing = raw.isna().to_numpy()
+        try:
+            values = raw.to_numpy(dtype=np.float64, na_value=np.nan)
+        except (TypeError, ValueError):
+            # 숫자가 아닌 값이 섞인 배치만 컬럼별로 변환
+            values = raw.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        bad_type = np.isnan(values) & ~missing
+        lows, highs = np.array(list(VALUE_RANGES.values()), dtype=np.float64).T
+        with np.errstate(invalid='ignore'):
+            out_of_range = (values < lows) | (values > highs)
+        for j, col in enumerate(value_columns):
+            reject(missing[:, j], f"missing:{col}")
+            reject(bad_type[:, j], f"type:{col}")
+            reject(out_of_range[:, j], f"range:{col}")
+        df[value_columns] = values
+
+        # 3. 상태값
+        reject(~df['annotation_state'].astype(str).isin(VALID_STATES), "range:annotation_state")
+
+        # 4. 단위 일관성 (기준 단위가 없는 센서는 이번 배치의 최빈 단위를 기준으로 고정)
+        for col in UNIT_COLUMNS:
+            if col not in self.expected_units:
+                mode = df[col].dropna().mode()
+                if not mode.empty:
+                    self.expected_units[col] = mode.iloc[0]
+        unit_columns = [col for col in UNIT_COLUMNS if col in self.expected_units]
+        expected = np.array([self.expected_units[col] for col in unit_columns], dtype=object)
+        wrong_unit = df[unit_columns].to_numpy(dtype=object) != expected
+        for j, col in enumerate(unit_columns):
+            reject(wrong_unit[:, j], f"unit:{col}")
+
+        # 5. 중복 (배치 내 중복 및 이번 적재의 이전 배치에서 통과한 filename)
+        # isin은 호출마다 누적된 집합 전체를 다시 해싱하므로, 배치 크기만큼만 집합을 조회
+        seen = df['filename'].map(self.seen_filenames.__contains__).to_numpy(dtype=bool)
+        reject(df['filename'].duplicated(keep='first').to_numpy() | seen, "duplicate:filename")
+
+        valid = reasons == ""
+        rejected = ~valid
+        self.seen_filenames.update(df['filename'].to_numpy()[valid.to_numpy()])
+        # 거부 사유의 마지막 구분자는 거부된 행에서만 제거
+        if rejected.any():
+            reasons[rejected] = reasons[rejected].str.rstrip(";")
+        self.elapsed += time.perf_counter() - start
+        self.checked += len(df)
+        self.rejected += int(rejected.sum())
+        return valid, reasons
+
+def quarantine(cur, entries):
+    """(zip_path, file, reason, document) 목록을 격리 테이블에 저장합니다."""
+    cur.executemany(
+        "INSERT INTO ingest_quarantine (zip_path, file, reason, document) VALUES (?, ?, ?, ?)",
+        [
+            (zip_path, file, reason, document if isinstance(document, str) or document is None else json.dumps(document, ensure_ascii=False))
+            for zip_path, file, reason, document in entries
+        ],
+    )
@@ -1,8 +1,18 @@
 import os
 import json
+import time
 import sqlite3
 from zipfile import ZipFile
 from glob import glob
+from state_episode import create_state_episode_tables, update_state_episodes
+from similarity_index import INDEX_PATH, build_similarity_index
+from ambient_baseline import create_ambient_tables, rebuild_ambient_scores
+from retention import PARTITION_DIR
+import pandas as pd
+from ingest_validation import (
+    DEVICE_FIELDS, QUARANTINE_SCHEMA, SENSOR_KEYS,
+    IngestValidator, SchemaError, flatten_document, quarantine,
+)
 
 # DB 연결
 db_path = "db/sensor_data.sqlite"
@@ -15,6 +25,15 @@ DROP TABLE IF EXISTS device_info;
 DROP TABLE IF EXISTS sensor_record;
 DROP TABLE IF EXISTS ir_data;
 DROP TABLE IF EXISTS external_data;
+DROP TABLE IF EXISTS state_episode;
+DROP TABLE IF EXISTS state_episode_progress;
+DROP TABLE IF EXISTS ingest_quarantine;
+DROP TABLE IF EXISTS ambient_baseline;
+DROP TABLE IF EXISTS ambient_score;
+DROP TABLE IF EXISTS ambient_score_progress;
+DROP TABLE IF EXISTS partition_catalog;
+DROP TABLE IF EXISTS sensor_hourly;
+DROP TABLE IF EXISTS sensor_daily;
 
 CREATE TABLE device_info (
     device_id TEXT PRIMARY KEY,
@@ -75,129 +94,151 @@ CREATE TABLE external_data (
     trend TEXT,
     FOREIGN KEY (record_id) REFERENCES sensor_record(record_id)
 );
+
+-- 장비별 조회와 sensor_record 조인(fleet_report.py 등)에 사용하는 인덱스
+CREATE INDEX idx_sensor_record_device ON sensor_record (device_id);
+CREATE INDEX idx_external_data_record ON external_data (record_id, sensor_type);
+CREATE INDEX idx_ir_data_record ON ir_data (record_id);
 """)
 
-# ZIP 파일 내부 JSON 파싱 함수
+# 상태 구간(state_episode) 테이블 생성
+create_state_episode_tables(conn)
+
+# 검증에 실패한 문서를 보관하는 격리(quarantine) 테이블 생성
+cur.executescript(QUARANTINE_SCHEMA)
+
+# 외부 환경 보정 기준선/이상 점수 테이블 생성
+create_ambient_tables(conn)
+
+# DB를 새로 만들기 때문에 record_id가 달라지므로 기존 유사도 인덱스는 삭제
+if os.path.exists(INDEX_PATH):
+    os.remove(INDEX_PATH)
+
+# 이전 압축 작업(retention.py)으로 분리된 월별 파티션 파일도 삭제
+# (남겨 두면 같은 record_id의 과거 레코드가 새 레코드와 함께 조회됨)
+for path in glob(os.path.join(PARTITION_DIR, "*.sqlite*")):
+    os.remove(path)
+
+# 한 번에 검증/적재할 문서 수
+BATCH_SIZE = 1000
+
+# DB를 새로 만들므로 단위 기준은 KNOWN_UNITS와 첫 배치의 최빈 단위, 중복 검사는 이번 적재 안에서만 수행
+validator = IngestValidator()
+ingest_elapsed = 0.0
+
+SENSOR_COLUMNS = [f"{col}_{suffix}" for col in SENSOR_KEYS.values() for suffix in ("value", "unit", "trend")]
+RECORD_COLUMNS = [
+    "record_id", "device_id", "filename", "collection_date", "collection_time",
+    "duration_time", "sensor_types", "cumulative_operating_day", "equipment_history",
+    "annotation_type", "annotation_state",
+] + SENSOR_COLUMNS
+IR_COLUMNS = ["record_id", "img_id", "location", "filename", "img_name", "img_description", "value_TGmx", "X_Tmax", "Y_Tmax"]
+
+# ZIP 파일 내부 JSON 파싱 함수 (BATCH_SIZE 단위로 검증 후 적재)
 def extract_json_from_zip(zip_path):
+    batch = []
     with ZipFile(zip_path, 'r') as zipf:
         for file in zipf.namelist():
             if file.endswith(".json"):
                 with zipf.open(file) as f:
-                    try:
-                        data = json.load(f)
-                        insert_normalized_data(data)
-                    except Exception as e:
-                        print(f"JSON 파싱 실패: {file} in {zip_path} — {e}")
-
-# INSERT 함수
-def insert_normalized_data(data):
-    m = data["meta_info"][0]
-    s = data["sensor_data"][0]
-    ir = data["ir_data"][0]["temp_max"][0]
-    ann = data["annotations"][0]["tagging"][0]
-    ext = data["external_data"][0]
-
-    def g(sensor, key):
-        return s.get(sensor, [{}])[0].get(key)
-
-    # 1. device_info (중복 방지)
-    cur.execute("SELECT 1 FROM device_info WHERE device_id = ?", (m["device_id"],))
-    if cur.fetchone() is None:
-        cur.execute("""
-            INSERT INTO device_info VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            m.get("device_id"),
-            m.get("device_name"),
-            m.get("device_manufacturer"),
-            m.get("dust_sensor_manufacturer"),
-            m.get("dust_sensor_name"),
-            m.get("temp_sensor_manufacturer"),
-            m.get("temp_sensor_name"),
-            m.get("overcurrent_sensor_manufacturer"),
-            m.get("overcurrent_sensor_name"),
-            m.get("thermal_camera_sensor_manufacturer"),
-            m.get("thermal_camera_sensor_name"),
-            m.get("img_description")
-        ))
-
-    # 2. sensor_record
-    cur.execute("""
-        INSERT INTO sensor_record (
-            device_id, filename, collection_date, collection_time,
-            duration_time, sensor_types, cumulative_operating_day, equipment_history,
-            annotation_type, annotation_state,
-            PM10_value, PM10_unit, PM10_trend,
-            PM2_5_value, PM2_5_unit, PM2_5_trend,
-            PM1_0_value, PM1_0_unit, PM1_0_trend,
-            NTC_value, NTC_unit, NTC_trend,
-            CT1_value, CT1_unit, CT1_trend,
-            CT2_value, CT2_unit, CT2_trend,
-            CT3_value, CT3_unit, CT3_trend,
-            CT4_value, CT4_unit, CT4_trend
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        m.get("device_id"),
-        m.get("filename"),
-        m.get("collection_date"),
-        m.get("collection_time"),
-        m.get("duration_time"),
-        m.get("sensor_types"),
-        m.get("cumulative_operating_day"),
-        m.get("equipment_history"),
-        ann.get("annotation_type"),
-        ann.get("state"),
-        g("PM10", "value"), g("PM10", "data_unit"), g("PM10", "trend"),
-        g("PM2.5", "value"), g("PM2.5", "data_unit"), g("PM2.5", "trend"),
-        g("PM1.0", "value"), g("PM1.0", "data_unit"), g("PM1.0", "trend"),
-        g("NTC", "value"), g("NTC", "data_unit"), g("NTC", "trend"),
-        g("CT1", "value"), g("CT1", "data_unit"), g("CT1", "trend"),
-        g("CT2", "value"), g("CT2", "data_unit"), g("CT2", "trend"),
-        g("CT3", "value"), g("CT3", "data_unit"), g("CT3", "trend"),
-        g("CT4", "value"), g("CT4", "data_unit"), g("CT4", "trend")
-    ))
-    record_id = cur.lastrowid
-
-    # 3. ir_data
-    cur.execute("""
-        INSERT INTO ir_data (
-            record_id, img_id, location, filename, img_name, img_description,
-            value_TGmx, X_Tmax, Y_Tmax
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        record_id,
-        m.get("img-id"),
-        m.get("location"),
-        m.get("filename"),
-        m.get("img_name"),
-        m.get("img_description"),
-        ir.get("value_TGmx"),
-        ir.get("X_Tmax"),
-        ir.get("Y_Tmax")
-    ))
-
-    # 4. external_data
-    for sensor_type, values in ext.items():
-        e = values[0]
-        cur.execute("""
-            INSERT INTO external_data (
-                record_id, sensor_type, value, unit, trend
-            ) VALUES (?, ?, ?, ?, ?)
-        """, (
-            record_id,
-            sensor_type,
-            e.get("value"),
-            e.get("data_unit"),
-            e.get("trend")
-        ))
+                    raw = f.read()
+                try:
+                    data = json.loads(raw)
+                except Exception as e:
+                    quarantine(cur, [(zip_path, file, f"json: {e}", raw.decode('utf-8', errors='replace'))])
+                    continue
+                batch.append((file, data))
+                if len(batch) >= BATCH_SIZE:
+                    process_batch(zip_path, batch)
+                    batch = []
+    if batch:
+        process_batch(zip_path, batch)
+
+# 배치 검증 및 INSERT 함수
+def process_batch(zip_path, batch):
+    global ingest_elapsed
+    start = time.perf_counter()
+
+    # 1. 평탄화 (구조 오류 문서는 바로 격리)
+    rows, sources, rejects = [], [], []
+    for file, data in batch:
+        try:
+            rows.append(flatten_document(data))
+            sources.append((file, data))
+        except SchemaError as e:
+            rejects.append((zip_path, file, str(e), data))
+    quarantine(cur, rejects)
+    if not rows:
+        ingest_elapsed += time.perf_counter() - start
+        return
+
+    # 2. 벡터화 검증 (필수값, 범위, 단위, 중복)
+    df = pd.DataFrame(rows)
+    valid, reasons = validator.validate(df)
+    quarantine(cur, [
+        (zip_path, sources[i][0], reasons.iloc[i], sources[i][1])
+        for i in (~valid).to_numpy().nonzero()[0]
+    ])
+    df = df[valid.to_numpy()]
+    if df.empty:
+        ingest_elapsed += time.perf_counter() - start
+        return
+
+    # 3. device_info (중복 방지)
+    devices = df.drop_duplicates('device_id')[DEVICE_FIELDS]
+    cur.executemany(
+        f"INSERT OR IGNORE INTO device_info ({', '.join(DEVICE_FIELDS)}) VALUES ({', '.join('?' * len(DEVICE_FIELDS))})",
+        devices.astype(object).where(devices.notna(), None).itertuples(index=False, name=None)
+    )
+
+    # 4. sensor_record (record_id를 직접 부여하여 ir_data / external_data와 연결)
+    next_id = cur.execute("SELECT COALESCE(MAX(record_id), 0) + 1 FROM sensor_record").fetchone()[0]
+    df = df.assign(record_id=range(next_id, next_id + len(df)))
+    df = df.astype(object).where(df.notna(), None)
+    cur.executemany(
+        f"INSERT INTO sensor_record ({', '.join(RECORD_COLUMNS)}) VALUES ({', '.join('?' * len(RECORD_COLUMNS))})",
+        df[RECORD_COLUMNS].itertuples(index=False, name=None)
+    )
+
+    # 5. ir_data
+    cur.executemany(
+        f"INSERT INTO ir_data ({', '.join(IR_COLUMNS)}) VALUES ({', '.join('?' * len(IR_COLUMNS))})",
+        df[IR_COLUMNS].itertuples(index=False, name=None)
+    )
+
+    # 6. external_data
+    cur.executemany(
+        "INSERT INTO external_data (record_id, sensor_type, value, unit, trend) VALUES (?, ?, ?, ?, ?)",
+        [
+            (record_id, *item)
+            for record_id, items in zip(df['record_id'], df['external_items'])
+            for item in items
+        ]
+    )
+    ingest_elapsed += time.perf_counter() - start
 
 
 # data/ 아래의 모든 zip 처리
 for zip_file in glob("data/*.zip"):
     extract_json_from_zip(zip_file)
+    # zip 단위로 새로 적재된 레코드만 반영하여 상태 구간을 증분 갱신
+    update_state_episodes(conn)
+
+# 전체 데이터로 장비별 환경 보정 기준선을 학습하고 레코드별 이상 점수를 저장
+# (이후 추가 적재분은 python ambient_baseline.py 로 새 레코드만 점수 계산)
+rebuild_ambient_scores(conn)
 
 # 저장
 conn.commit()
 conn.close()
 
+# 검증 결과 요약
+if validator.checked:
+    print(f"검증 문서 수: {validator.checked}, 격리: {validator.rejected}")
+    print(f"검증 시간: {validator.elapsed:.2f}s / 적재 시간: {ingest_elapsed:.2f}s ({validator.elapsed / ingest_elapsed * 100:.1f}%)")
+
+# 센서 윈도우 요약 벡터 기반 유사도 인덱스 생성
+build_similarity_index(db_path)
+
 # 결과 파일 경로 반환
 db_path
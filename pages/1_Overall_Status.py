@@ -1,7 +1,12 @@
 import streamlit as st
+from startup import PaintTimer, ensure_warm_up
+
+# pandas 등 이후 import 비용까지 첫 화면 표시 시간에 포함
+paint_timer = PaintTimer("1_Overall_Status")
+
 import pandas as pd
-import plotly.express as px
-from data_access import get_overall_equipment_status
+from query_client import get_overall_equipment_status, get_fleet_state_statistics, get_fleet_mtbf, get_fleet_ambient_scores
+from ambient_baseline import ANOMALY_THRESHOLD
 from utils import STATE_MAP, COLOR_MAP
 
 st.set_page_config(
@@ -10,6 +15,8 @@ st.set_page_config(
     layout="wide",
 )
 
+ensure_warm_up()
+
 st.title("📊 종합 현황")
 st.markdown("전체 장비의 현재 상태를 요약하여 보여줍니다.")
 
@@ -32,8 +39,11 @@ else:
         st.metric(label="🟡 주의", value=state_counts.get('주의', 0))
         st.metric(label="🟠 경고", value=state_counts.get('경고', 0))
         st.metric(label="🔴 위험", value=state_counts.get('위험', 0))
+    paint_timer.mark_paint()
 
     with col2:
+        # plotly.express는 import 비용이 크므로 첫 차트를 그릴 때 불러옴
+        import plotly.express as px
         fig = px.pie(state_counts, values=state_counts.values, names=state_counts.index, 
                      title='장비 상태 비율', hole=.4,
                      color=state_counts.index, 
@@ -69,4 +79,58 @@ else:
                 'collection_date': '마지막 업데이트 날짜',
                 'collection_time': '마지막 업데이트 시간'
             }
-        ), use_container_width=True)
\ No newline at end of file
+        ), use_container_width=True)
+
+    st.divider()
+
+    # 상태 구간(state_episode) 기반 체류 시간 및 MTBF 통계
+    st.subheader("⏱️ 상태별 체류 시간 및 MTBF")
+    df_state_stats = get_fleet_state_statistics()
+    df_mtbf = get_fleet_mtbf()
+    if df_state_stats.empty:
+        st.info("상태 구간 데이터가 없습니다. 데이터 로드 스크립트를 다시 실행하세요.")
+    else:
+        col3, col4 = st.columns(2)
+        with col3:
+            fleet_dwell = df_state_stats.groupby('state').agg(
+                episode_count=('episode_count', 'sum'),
+                total_dwell=('total_dwell', 'sum'),
+            )
+            fleet_dwell['mean_dwell'] = fleet_dwell['total_dwell'] / fleet_dwell['episode_count']
+            fleet_dwell.index = fleet_dwell.index.map(STATE_MAP)
+            st.dataframe(fleet_dwell.rename_axis('상태').rename(
+                columns={
+                    'episode_count': '구간 수',
+                    'total_dwell': '총 체류 시간',
+                    'mean_dwell': '평균 체류 시간'
+                }
+            ), use_container_width=True)
+        with col4:
+            st.dataframe(df_mtbf.rename(
+                columns={
+                    'device_id': '장비 ID',
+                    'failure_count': '위험 진입 횟수',
+                    'mtbf': 'MTBF',
+                    'last_failure': '마지막 위험 진입'
+                }
+            ), use_container_width=True)
+
+    st.divider()
+
+    # 적재 시 미리 계산해 둔 외부 환경 보정 이상 점수 (ambient_baseline.py)
+    st.subheader("🌡️ 외부 환경 보정 이상 점수")
+    st.markdown(f"외부 온도/습도/조도의 영향을 제외한 PM·NTC 잔차 점수입니다. {ANOMALY_THRESHOLD:g}을 넘으면 환경만으로 설명되지 않는 이상으로 봅니다.")
+    df_ambient = get_fleet_ambient_scores(ANOMALY_THRESHOLD)
+    if df_ambient.empty:
+        st.info("환경 보정 이상 점수가 없습니다. 데이터 로드 스크립트 또는 `python ambient_baseline.py`를 실행하세요.")
+    else:
+        st.dataframe(df_ambient.rename(
+            columns={
+                'device_id': '장비 ID',
+                'latest_score': '최신 점수',
+                'latest_top_sensor': '최신 주요 센서',
+                'max_score': '최대 점수',
+                'anomaly_rate': '기준 초과 비율 (%)',
+                'scored_count': '레코드 수'
+            }
+        ), use_container_width=True)
@@ -1,8 +1,19 @@
 import streamlit as st
+from startup import PaintTimer, ensure_warm_up
+
+# pandas 등 이후 import 비용까지 첫 화면 표시 시간에 포함
+paint_timer = PaintTimer("2_Device_Details")
+
 import pandas as pd
-import plotly.express as px
-from data_access import get_device_list, get_sensor_data_by_device, get_external_data_by_device
-from utils import STATE_MAP, COLOR_MAP, apply_date_filter, configure_xaxis
+from query_client import (
+    get_device_list, get_date_bounds, get_state_episodes_by_device, get_ambient_scores_by_device,
+    get_sensor_aggregates_by_device,
+)
+from prefetch import load_device_data, prefetch_adjacent
+from utils import STATE_MAP, COLOR_MAP, select_date_range, build_line_chart
+from similarity_index import WINDOW_SIZE, frame_features, load_similarity_index
+from ambient_baseline import ANOMALY_THRESHOLD
+from data_access import SENSOR_COLUMNS
 
 st.set_page_config(
     page_title="개별 장비 분석",
@@ -10,6 +21,13 @@ st.set_page_config(
     layout="wide",
 )
 
+ensure_warm_up()
+
+@st.cache_resource
+def get_similarity_index():
+    """유사도 인덱스를 한 번만 불러와 세션 간에 공유합니다."""
+    return load_similarity_index()
+
 st.title("⚙️ 개별 장비 분석")
 st.markdown("특정 장비를 선택하여 상세 센서 데이터와 이력을 조회합니다.")
 
@@ -33,77 +51,181 @@ else:
 
     st.header(f"{selected_device_name} (ID: {selected_device_id}) 분석")
 
-    # 2. 데이터 로드
+    # 2. 기간 선택 (선택한 기간에 걸치는 파티션만 조회)
+    date_range = select_date_range(get_date_bounds(), key_prefix="device_details")
+    if date_range is None:
+        st.stop()
+    start_date, end_date = date_range
+
+    # 3. 데이터 로드
     with st.spinner("센서 데이터를 불러오는 중..."):
-        df_sensor = get_sensor_data_by_device(selected_device_id)
-        df_external = get_external_data_by_device(selected_device_id)
+        try:
+            # 센서/외부 환경 데이터를 동시에 조회
+            df_sensor, df_external = load_device_data(selected_device_id, start_date=start_date, end_date=end_date)
+        except ValueError as e:
+            # 조회 기간에 걸치는 파티션이 너무 많은 경우
+            st.error(str(e))
+            st.stop()
+        df_episodes = get_state_episodes_by_device(selected_device_id)
+        # 적재 시 미리 계산해 둔 환경 보정 이상 점수 (화면에서 다시 계산하지 않음)
+        df_ambient = get_ambient_scores_by_device(selected_device_id, start_date, end_date)
+    # 목록에서 인접한 장비의 같은 기간 데이터를 백그라운드에서 미리 조회
+    prefetch_adjacent(device_list['device_id'].tolist(), selected_device_id, start_date=start_date, end_date=end_date)
 
     if df_sensor.empty:
-        st.warning("선택된 장비의 센서 데이터를 찾을 수 없습니다.")
+        st.warning("선택된 기간에 해당하는 센서 데이터가 없습니다.")
     else:
-        # 날짜 필터링 적용
-        df_sensor_filtered = apply_date_filter(df_sensor, key_prefix="device_details_sensor")
-        df_external_filtered = apply_date_filter(df_external, key_prefix="device_details_external")
-
-        if df_sensor_filtered.empty:
-            st.warning("선택된 기간에 해당하는 센서 데이터가 없습니다.")
-        else:
-            # x축 레이블을 위한 포맷팅 (필터링된 데이터에 적용)
-            df_sensor_filtered['timestamp_label'] = df_sensor_filtered['timestamp'].dt.strftime('%m-%d %H:%M')
-            if not df_external_filtered.empty:
-                df_external_filtered['timestamp_label'] = df_external_filtered['timestamp'].dt.strftime('%m-%d %H:%M')
-
-            # 3. 탭 기반 데이터 시각화 (필터링된 데이터 사용)
-            tab1, tab2, tab3, tab4, tab5 = st.tabs(["상태 변화", "미세먼지 (PM)", "온도 (NTC)", "전류 (CT)", "외부 환경"])
-
-            with tab1:
-                st.subheader("시간에 따른 장비 상태 변화")
-                df_sensor_filtered['state_label'] = df_sensor_filtered['annotation_state'].astype(int).map(STATE_MAP)
-                fig_state = px.scatter(df_sensor_filtered, x='timestamp_label', y='state_label', color='state_label', 
-                                     title='시간에 따른 장비 상태 변화', labels={'state_label': '장비 상태', 'timestamp_label': '측정 시점'}, 
-                                     category_orders={"state_label": ['정상', '주의', '경고', '위험']})
-                configure_xaxis(fig_state)
+        # 4. 탭 기반 데이터 시각화
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["상태 변화", "미세먼지 (PM)", "온도 (NTC)", "전류 (CT)", "외부 환경", "유사 패턴", "환경 보정 이상 점수"])
+
+        with tab1:
+            st.subheader("시간에 따른 장비 상태 변화")
+            # 레코드 전체가 아닌 상태 구간(state_episode) 단위로 표시
+            period_start = df_sensor['timestamp'].min()
+            period_end = df_sensor['timestamp'].max()
+            if df_episodes.empty:
+                st.info("해당 장비의 상태 구간 데이터가 없습니다.")
+                paint_timer.mark_paint()
+            else:
+                df_episodes_filtered = df_episodes[(df_episodes['end_ts'] >= period_start) & (df_episodes['start_ts'] <= period_end)].copy()
+                df_episodes_filtered['state_label'] = df_episodes_filtered['state'].map(STATE_MAP)
+                df_episodes_filtered['prev_state_label'] = df_episodes_filtered['prev_state'].map(STATE_MAP)
+                # plotly.express는 import 비용이 크므로 차트를 그릴 때 불러옴
+                import plotly.express as px
+                fig_state = px.timeline(df_episodes_filtered, x_start='start_ts', x_end='end_ts', y='state_label', color='state_label',
+                                        title='시간에 따른 장비 상태 변화', labels={'state_label': '장비 상태'},
+                                        color_discrete_map=COLOR_MAP,
+                                        hover_data=['record_count'],
+                                        category_orders={"state_label": ['정상', '주의', '경고', '위험']})
                 st.plotly_chart(fig_state, use_container_width=True)
-
-            with tab2:
-                st.subheader("미세먼지 센서 데이터 (µg/m³)")
-                fig_pm = px.line(df_sensor_filtered, x='timestamp_label', y=['PM10_value', 'PM2_5_value', 'PM1_0_value'], 
-                               title='시간에 따른 미세먼지 농도 변화', labels={'value': '농도 (µg/m³)', 'variable': '센서 종류', 'timestamp_label': '측정 시점'})
-                configure_xaxis(fig_pm)
-                st.plotly_chart(fig_pm, use_container_width=True)
-
-            with tab3:
-                st.subheader("온도 센서 데이터 (℃)")
-                fig_temp = px.line(df_sensor_filtered, x='timestamp_label', y=['NTC_value'], 
-                                 title='시간에 따른 장비 온도 변화', labels={'value': '온도 (℃)', 'variable': '센서 종류', 'timestamp_label': '측정 시점'})
-                configure_xaxis(fig_temp)
-                st.plotly_chart(fig_temp, use_container_width=True)
-
-            with tab4:
-                st.subheader("전류 센서 데이터 (A)")
-                fig_ct = px.line(df_sensor_filtered, x='timestamp_label', y=['CT1_value', 'CT2_value', 'CT3_value', 'CT4_value'], 
-                               title='시간에 따른 전류량 변화', labels={'value': '전류 (A)', 'variable': '센서 종류', 'timestamp_label': '측정 시점'})
-                configure_xaxis(fig_ct)
-                st.plotly_chart(fig_ct, use_container_width=True)
-
-            with tab5:
-                if not df_external_filtered.empty:
-                    st.subheader("외부 환경 데이터")
-                    fig_ext_temp = px.line(df_external_filtered, x='timestamp_label', y=['ex_temperature'], title='외부 온도 변화', labels={'value': '온도 (℃)', 'timestamp_label': '측정 시점'})
-                    configure_xaxis(fig_ext_temp)
-                    st.plotly_chart(fig_ext_temp, use_container_width=True)
-
-                    fig_ext_hum = px.line(df_external_filtered, x='timestamp_label', y=['ex_humidity'], title='외부 습도 변화', labels={'value': '습도 (%)', 'timestamp_label': '측정 시점'})
-                    configure_xaxis(fig_ext_hum)
-                    st.plotly_chart(fig_ext_hum, use_container_width=True)
-
-                    fig_ext_ill = px.line(df_external_filtered, x='timestamp_label', y=['ex_illuminance'], title='외부 조도 변화', labels={'value': '조도 (lux)', 'timestamp_label': '측정 시점'})
-                    configure_xaxis(fig_ext_ill)
-                    st.plotly_chart(fig_ext_ill, use_container_width=True)
+                paint_timer.mark_paint()
+
+                st.markdown("**상태 전이 이력**")
+                st.dataframe(df_episodes_filtered[['prev_state_label', 'state_label', 'start_ts', 'end_ts', 'duration', 'record_count']].rename(
+                    columns={
+                        'prev_state_label': '이전 상태',
+                        'state_label': '상태',
+                        'start_ts': '시작 시점',
+                        'end_ts': '종료 시점',
+                        'duration': '체류 시간',
+                        'record_count': '레코드 수'
+                    }
+                ), use_container_width=True)
+
+        with tab2:
+            st.subheader("미세먼지 센서 데이터 (µg/m³)")
+            fig_pm = build_line_chart(df_sensor, y=['PM10_value', 'PM2_5_value', 'PM1_0_value'], 
+                           title='시간에 따른 미세먼지 농도 변화', labels={'value': '농도 (µg/m³)', 'variable': '센서 종류', 'timestamp': '측정 시점'})
+            st.plotly_chart(fig_pm, use_container_width=True)
+
+        with tab3:
+            st.subheader("온도 센서 데이터 (℃)")
+            fig_temp = build_line_chart(df_sensor, y=['NTC_value'], 
+                             title='시간에 따른 장비 온도 변화', labels={'value': '온도 (℃)', 'variable': '센서 종류', 'timestamp': '측정 시점'})
+            st.plotly_chart(fig_temp, use_container_width=True)
+
+        with tab4:
+            st.subheader("전류 센서 데이터 (A)")
+            fig_ct = build_line_chart(df_sensor, y=['CT1_value', 'CT2_value', 'CT3_value', 'CT4_value'], 
+                           title='시간에 따른 전류량 변화', labels={'value': '전류 (A)', 'variable': '센서 종류', 'timestamp': '측정 시점'})
+            st.plotly_chart(fig_ct, use_container_width=True)
+
+        with tab5:
+            if not df_external.empty:
+                st.subheader("외부 환경 데이터")
+                fig_ext_temp = build_line_chart(df_external, y=['ex_temperature'], title='외부 온도 변화', labels={'value': '온도 (℃)', 'timestamp': '측정 시점'})
+                st.plotly_chart(fig_ext_temp, use_container_width=True)
+
+                fig_ext_hum = build_line_chart(df_external, y=['ex_humidity'], title='외부 습도 변화', labels={'value': '습도 (%)', 'timestamp': '측정 시점'})
+                st.plotly_chart(fig_ext_hum, use_container_width=True)
+
+                fig_ext_ill = build_line_chart(df_external, y=['ex_illuminance'], title='외부 조도 변화', labels={'value': '조도 (lux)', 'timestamp': '측정 시점'})
+                st.plotly_chart(fig_ext_ill, use_container_width=True)
+            else:
+                st.info("해당 장비의 외부 환경 데이터가 없습니다.")
+
+        with tab6:
+            st.subheader("유사 패턴 검색")
+            st.markdown(f"선택 기간의 마지막 {WINDOW_SIZE}개 레코드와 센서(PM/NTC/CT) 요약 패턴이 가장 비슷한 장비 및 과거 구간을 찾습니다.")
+            similarity_index = get_similarity_index()
+            if similarity_index is None or len(similarity_index) == 0:
+                st.info("유사도 인덱스가 없습니다. 데이터 로드 스크립트를 실행하세요.")
+            else:
+                col1, col2 = st.columns(2)
+                with col1:
+                    top_k = st.slider("검색할 구간 수", min_value=5, max_value=50, value=10)
+                with col2:
+                    exclude_self = st.checkbox("같은 장비 제외", value=False)
+                df_query = df_sensor.tail(WINDOW_SIZE)
+                df_similar = similarity_index.query(
+                    frame_features(df_query),
+                    k=top_k + len(df_query) // WINDOW_SIZE + 1,
+                    exclude_device=selected_device_id if exclude_self else None
+                )
+                # 검색 기준 구간 자신과 겹치는 윈도우는 제외 (윈도우는 측정 시각 순서로 구성되므로 시각으로 비교)
+                overlaps = (
+                    (df_similar['device_id'] == selected_device_id)
+                    & (df_similar['start_ts'] <= df_query['timestamp'].max().strftime('%m-%d %H:%M:%S'))
+                    & (df_similar['end_ts'] >= df_query['timestamp'].min().strftime('%m-%d %H:%M:%S'))
+                )
+                df_similar = df_similar[~overlaps].head(top_k)
+                st.dataframe(df_similar[['device_id', 'start_ts', 'end_ts', 'distance']].rename(
+                    columns={
+                        'device_id': '장비 ID',
+                        'start_ts': '시작 시점',
+                        'end_ts': '종료 시점',
+                        'distance': '거리'
+                    }
+                ), use_container_width=True)
+
+        with tab7:
+            st.subheader("외부 환경 보정 이상 점수")
+            st.markdown(
+                "외부 온도/습도/조도로 설명되는 변화를 제외한 미세먼지(PM)·장비 온도(NTC)의 잔차를 표준편차 단위로 나타냅니다. "
+                f"점수가 {ANOMALY_THRESHOLD:g}을 넘으면 주변 환경만으로는 설명되지 않는 이상으로 봅니다."
+            )
+            if df_ambient.empty:
+                st.info("환경 보정 이상 점수가 없습니다. 데이터 로드 스크립트 또는 `python ambient_baseline.py`를 실행하세요.")
+            else:
+                df_ambient_filtered = df_ambient[df_ambient['timestamp'].between(df_sensor['timestamp'].min(), df_sensor['timestamp'].max())]
+                if df_ambient_filtered.empty:
+                    st.info("선택된 기간에 해당하는 이상 점수가 없습니다.")
                 else:
-                    st.info("해당 장비의 외부 환경 데이터가 없습니다.")
-
-            with st.expander("상세 데이터 보기"):
-                st.dataframe(df_sensor, use_container_width=True)
-                if not df_external.empty:
-                    st.dataframe(df_external, use_container_width=True)
\ No newline at end of file
+                    col1, col2 = st.columns(2)
+                    col1.metric("기준 초과 비율", f"{(df_ambient_filtered['score'] > ANOMALY_THRESHOLD).mean() * 100:.1f}%")
+                    col2.metric("최대 점수", f"{df_ambient_filtered['score'].max():.2f}")
+
+                    fig_ambient = build_line_chart(df_ambient_filtered, y=['score'], title='시간에 따른 환경 보정 이상 점수',
+                                                   labels={'score': '이상 점수 (|z|)', 'timestamp': '측정 시점'})
+                    fig_ambient.add_hline(y=ANOMALY_THRESHOLD, line_dash='dash', line_color='red')
+                    st.plotly_chart(fig_ambient, use_container_width=True)
+
+                    st.markdown("**점수가 높은 레코드**")
+                    st.dataframe(df_ambient_filtered.nlargest(10, 'score')[['timestamp', 'score', 'top_sensor', 'PM10_z', 'PM2_5_z', 'PM1_0_z', 'NTC_z']].rename(
+                        columns={
+                            'timestamp': '측정 시점',
+                            'score': '이상 점수',
+                            'top_sensor': '주요 센서'
+                        }
+                    ), use_container_width=True)
+
+        with st.expander("상세 데이터 보기"):
+            st.dataframe(df_sensor, use_container_width=True)
+            if not df_external.empty:
+                st.dataframe(df_external, use_container_width=True)
+
+    # 5. 보존 기간이 지나 원본이 삭제된 구간은 시간별/일별 집계로 조회 (기간 필터와 무관하게 전체 이력 표시)
+    st.subheader("장기 집계 이력")
+    col1, col2 = st.columns(2)
+    with col1:
+        resolution = st.radio("집계 단위", ['hourly', 'daily'], format_func={'hourly': '시간별', 'daily': '일별'}.get,
+                              horizontal=True, key="device_details_aggregate_resolution")
+    with col2:
+        aggregate_sensor = st.selectbox("센서", SENSOR_COLUMNS, key="device_details_aggregate_sensor")
+    df_aggregate = get_sensor_aggregates_by_device(selected_device_id, resolution)
+    if df_aggregate.empty:
+        st.info("집계 이력이 없습니다. 보존 기간이 지난 원본은 `python retention.py` 실행 시 집계로 남습니다.")
+    else:
+        fig_aggregate = build_line_chart(df_aggregate, y=[f'{aggregate_sensor}_avg', f'{aggregate_sensor}_min', f'{aggregate_sensor}_max'],
+                                         title=f'{aggregate_sensor} 집계 (평균/최소/최대)', labels={'value': '값', 'timestamp': '집계 시점'})
+        st.plotly_chart(fig_aggregate, use_container_width=True)
@@ -1,8 +1,13 @@
 import streamlit as st
+from startup import PaintTimer, ensure_warm_up
+
+# pandas 등 이후 import 비용까지 첫 화면 표시 시간에 포함
+paint_timer = PaintTimer("3_Data_Analysis")
+
 import pandas as pd
-import plotly.express as px
-from data_access import get_device_list, get_sensor_data_by_device
-from utils import STATE_MAP, COLOR_MAP, apply_date_filter
+from query_client import get_device_list, get_date_bounds
+from prefetch import load_device_data, prefetch_adjacent
+from utils import STATE_MAP, COLOR_MAP, select_date_range
 
 st.set_page_config(
     page_title="데이터 분석",
@@ -10,6 +15,8 @@ st.set_page_config(
     layout="wide",
 )
 
+ensure_warm_up()
+
 st.title("📈 데이터 분석")
 st.markdown("센서 데이터 간의 관계를 분석하여 이상 원인 탐색을 지원합니다.")
 
@@ -31,54 +38,66 @@ else:
 
     st.header(f"{selected_display_name} 데이터 분석")
 
-    # 2. 데이터 로드
+    # 2. 기간 선택 (선택한 기간에 걸치는 파티션만 조회)
+    date_range = select_date_range(get_date_bounds(), key_prefix="data_analysis")
+    if date_range is None:
+        st.stop()
+    start_date, end_date = date_range
+
+    # 3. 데이터 로드
     with st.spinner("센서 데이터를 불러오는 중..."):
-        df_sensor = get_sensor_data_by_device(selected_device_id)
+        try:
+            df_sensor = load_device_data(selected_device_id, with_external=False, start_date=start_date, end_date=end_date)
+        except ValueError as e:
+            # 조회 기간에 걸치는 파티션이 너무 많은 경우
+            st.error(str(e))
+            st.stop()
+    # 목록에서 인접한 장비의 같은 기간 데이터를 백그라운드에서 미리 조회
+    prefetch_adjacent(device_list['device_id'].tolist(), selected_device_id, with_external=False,
+                      start_date=start_date, end_date=end_date)
 
     if df_sensor.empty:
-        st.warning("선택된 장비의 센서 데이터를 찾을 수 없습니다.")
+        st.warning("선택된 기간에 해당하는 센서 데이터가 없습니다.")
     else:
-        # 날짜 필터링 적용
-        df_sensor_filtered = apply_date_filter(df_sensor, key_prefix="data_analysis")
-
-        if df_sensor_filtered.empty:
-            st.warning("선택된 기간에 해당하는 센서 데이터가 없습니다.")
-        else:
-            sensor_columns = ['PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value', 'CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
-            df_numeric = df_sensor_filtered[sensor_columns].copy()
+        sensor_columns = ['PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value', 'CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
+        df_numeric = df_sensor[sensor_columns].copy()
 
-            # 3. 상관관계 히트맵
-            st.subheader("센서 데이터 상관관계 히트맵")
-            st.markdown("센서 간의 선형 관계를 시각적으로 분석합니다. 붉은색은 강한 양의 상관관계, 푸른색은 강한 음의 상관관계를 의미합니다.")
-            corr = df_numeric.corr()
-            fig_heatmap = px.imshow(corr, text_auto=True, aspect="auto", 
-                                    title="주요 센서 간 상관관계",
-                                    color_continuous_scale='icefire',
-                                    zmin=-1, zmax=1) # 색상 범위를 -1에서 1로 고정
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+        # 4. 상관관계 히트맵
+        st.subheader("센서 데이터 상관관계 히트맵")
+        st.markdown("센서 간의 선형 관계를 시각적으로 분석합니다. 붉은색은 강한 양의 상관관계, 푸른색은 강한 음의 상관관계를 의미합니다.")
+        corr = df_numeric.corr()
+        # plotly.express는 import 비용이 크므로 차트를 그릴 때 불러옴
+        import plotly.express as px
+        fig_heatmap = px.imshow(corr, text_auto=True, aspect="auto", 
+                                title="주요 센서 간 상관관계",
+                                color_continuous_scale='icefire',
+                                zmin=-1, zmax=1) # 색상 범위를 -1에서 1로 고정
+        st.plotly_chart(fig_heatmap, use_container_width=True)
+        paint_timer.mark_paint()
 
-            st.divider()
+        st.divider()
 
-            # 4. 센서별 산점도
-            st.subheader("센서별 관계 분석 (산점도)")
-            st.markdown("두 센서를 선택하여 데이터 분포와 이상치의 관계를 자세히 확인합니다. 점의 색상은 장비의 상태를 나타냅니다.")
-            col1, col2 = st.columns(2)
-            with col1:
-                x_axis = st.selectbox("X축으로 사용할 센서를 선택하세요.", sensor_columns, index=0)
-            with col2:
-                y_axis = st.selectbox("Y축으로 사용할 센서를 선택하세요.", sensor_columns, index=1)
+        # 5. 센서별 산점도
+        st.subheader("센서별 관계 분석 (산점도)")
+        st.markdown("두 센서를 선택하여 데이터 분포와 이상치의 관계를 자세히 확인합니다. 점의 색상은 장비의 상태를 나타냅니다.")
+        col1, col2 = st.columns(2)
+        with col1:
+            x_axis = st.selectbox("X축으로 사용할 센서를 선택하세요.", sensor_columns, index=0)
+        with col2:
+            y_axis = st.selectbox("Y축으로 사용할 센서를 선택하세요.", sensor_columns, index=1)
             
-            if x_axis and y_axis:
-                # 상관계수 계산 및 표시
-                correlation_value = df_sensor_filtered[x_axis].corr(df_sensor_filtered[y_axis])
-                st.info(f"**{x_axis}**와 **{y_axis}**의 상관계수: **{correlation_value:.2f}**")
+        if x_axis and y_axis:
+            # 상관계수 계산 및 표시
+            correlation_value = df_sensor[x_axis].corr(df_sensor[y_axis])
+            st.info(f"**{x_axis}**와 **{y_axis}**의 상관계수: **{correlation_value:.2f}**")
 
-                # 상태 정보 매핑
-                df_sensor_filtered['state_label'] = df_sensor_filtered['annotation_state'].astype(int).map(STATE_MAP)
+            # 상태 정보 매핑
+            df_sensor['state_label'] = df_sensor['annotation_state'].astype(int).map(STATE_MAP)
 
-                fig_scatter = px.scatter(df_sensor_filtered, x=x_axis, y=y_axis, 
-                                         color="state_label", 
-                                         color_discrete_map=COLOR_MAP,
-                                         title=f'{x_axis} vs. {y_axis}',
-                                         hover_data=['timestamp'])
-                st.plotly_chart(fig_scatter, use_container_width=True)
\ No newline at end of file
+            fig_scatter = px.scatter(df_sensor, x=x_axis, y=y_axis, 
+                                     color="state_label", 
+                                     color_discrete_map=COLOR_MAP,
+                                     title=f'{x_axis} vs. {y_axis}',
+                                     hover_data=['timestamp'],
+                                     render_mode='webgl')
+            st.plotly_chart(fig_scatter, use_container_width=True)
\ No newline at end of file
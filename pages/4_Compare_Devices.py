@@ -1,8 +1,13 @@
 import streamlit as st
+from startup import PaintTimer, ensure_warm_up
+
+# pandas 등 이후 import 비용까지 첫 화면 표시 시간에 포함
+paint_timer = PaintTimer("4_Compare_Devices")
+
 import pandas as pd
-import plotly.express as px
-from data_access import get_device_list, get_sensor_data_for_devices
-from utils import apply_date_filter, configure_xaxis
+from query_client import get_device_list, get_date_bounds
+from prefetch import load_compare_data, prefetch_adjacent_compare
+from utils import select_date_range, build_line_chart
 
 st.set_page_config(
     page_title="장비 비교 분석",
@@ -10,6 +15,8 @@ st.set_page_config(
     layout="wide",
 )
 
+ensure_warm_up()
+
 st.title("🆚 장비 비교 분석")
 st.markdown("여러 장비를 선택하여 주요 센서 데이터를 비교 분석합니다.")
 
@@ -51,36 +58,42 @@ else:
         # 선택된 display_name으로부터 device_id 리스트 추출
         selected_device_ids = device_list[device_list['display_name'].isin(selected_display_names)]['device_id'].tolist()
 
-        # 3. 데이터 로드
+        # 3. 기간 선택 (선택한 기간에 걸치는 파티션만 조회)
+        date_range = select_date_range(get_date_bounds(), key_prefix="compare_devices")
+        if date_range is None:
+            st.stop()
+        start_date, end_date = date_range
+
+        # 4. 데이터 로드
         with st.spinner("비교 데이터를 불러오는 중..."):
-            df_compare = get_sensor_data_for_devices(selected_device_ids)
+            try:
+                # 장비별 데이터를 동시에 조회 (캐시된 장비는 바로 사용)
+                df_compare = load_compare_data(selected_device_ids, start_date, end_date)
+            except ValueError as e:
+                # 조회 기간에 걸치는 파티션이 너무 많은 경우
+                st.error(str(e))
+                st.stop()
+        # 선택된 장비와 인접한 장비의 같은 기간 데이터를 백그라운드에서 미리 조회
+        prefetch_adjacent_compare(device_list['device_id'].tolist(), selected_device_ids,
+                                  start_date=start_date, end_date=end_date)
 
         if df_compare.empty:
-            st.warning("선택된 장비의 데이터를 불러올 수 없습니다.")
+            st.warning("선택된 기간에 해당하는 데이터가 없습니다.")
         else:
-            # 날짜 필터링 적용
-            df_compare_filtered = apply_date_filter(df_compare, key_prefix="compare_devices")
-
-            if df_compare_filtered.empty:
-                st.warning("선택된 기간에 해당하는 데이터가 없습니다.")
-            else:
-                st.header(f'`{sensor_columns[selected_sensor]}` 데이터 비교')
-
-                # x축 레이블 포맷팅
-                df_compare_filtered['timestamp_label'] = df_compare_filtered['timestamp'].dt.strftime('%m-%d %H:%M')
+            st.header(f'`{sensor_columns[selected_sensor]}` 데이터 비교')
 
-                # 5. 비교 차트 시각화 (색상 기준: device_id)
-                fig = px.line(df_compare_filtered, x='timestamp_label', y=selected_sensor, color='device_id',
-                              title=f'장비별 {sensor_columns[selected_sensor]} 비교 분석',
-                              labels={
-                                  'timestamp_label': '측정 시점',
-                                  selected_sensor: f'{sensor_columns[selected_sensor]} 값',
-                                  'device_id': '장비 ID'
-                              },
-                              markers=True)
-                configure_xaxis(fig)
-                st.plotly_chart(fig, use_container_width=True)
+            # 5. 비교 차트 시각화 (색상 기준: device_id)
+            fig = build_line_chart(df_compare, y=selected_sensor, color='device_id',
+                          title=f'장비별 {sensor_columns[selected_sensor]} 비교 분석',
+                          labels={
+                              'timestamp': '측정 시점',
+                              selected_sensor: f'{sensor_columns[selected_sensor]} 값',
+                              'device_id': '장비 ID'
+                          },
+                          markers=True)
+            st.plotly_chart(fig, use_container_width=True)
+            paint_timer.mark_paint()
 
-                # 6. 상세 데이터 보기
-                with st.expander("비교 데이터 상세 보기"):
-                    st.dataframe(df_compare_filtered, use_container_width=True)
+            # 6. 상세 데이터 보기
+            with st.expander("비교 데이터 상세 보기"):
+                st.dataframe(df_compare, use_container_width=True)
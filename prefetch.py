@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from compact_frame import maybe_compact
+from query_client import get_sensor_data_by_device, get_external_data_by_device, get_sensor_data_for_devices
+
+# 장비 데이터를 백그라운드에서 불러오는 스레드 풀 (프로세스 내 모든 세션이 공유)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+class FrameCache:
+    """(로더 이름, 장비 ID, 시작일, 종료일)별 조회 Future를 보관하는 크기 제한 LRU 캐시입니다."""
+
+    def __init__(self, max_entries: int = 32, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, loader, *args):
+        """캐시에 유효한 Future가 있으면 재사용하고, 없으면 스레드 풀에 조회를 제출합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, future = entry
+                expired = time.monotonic() - created >= self.ttl
+                failed = future.done() and future.exception() is not None
+                if not expired and not failed:
+                    self._entries.move_to_end(key)
+                    return future
+            future = _executor.submit(loader, *args)
+            self._entries[key] = (time.monotonic(), future)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return future
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = FrameCache()
+
+def _load(loader, *args):
+    # 여러 세션이 공유하는 캐시이므로 설정에 따라 압축 표현으로 보관
+    return maybe_compact(loader(*args))
+
+def _submit_sensor(device_id: str, start_date: str = None, end_date: str = None):
+    return _cache.submit(('sensor', device_id, start_date, end_date), _load,
+                         get_sensor_data_by_device, device_id, start_date, end_date)
+
+def _submit_external(device_id: str, start_date: str = None, end_date: str = None):
+    return _cache.submit(('external', device_id, start_date, end_date), _load,
+                         get_external_data_by_device, device_id, start_date, end_date)
+
+def _submit_compare(device_id: str, start_date: str = None, end_date: str = None):
+    return _cache.submit(('compare', device_id, start_date, end_date), _load,
+                         get_sensor_data_for_devices, [device_id], start_date, end_date)
+
+def load_device_data(device_id: str, with_external: bool = True, start_date: str = None, end_date: str = None):
+    """
+    센서 데이터와 외부 환경 데이터를 동시에 불러옵니다. start_date / end_date(MM-DD)로 조회 기간을 제한합니다.
+    캐시된 결과는 여러 세션이 공유하므로 복사본을 반환합니다.
+    """
+    sensor_future = _submit_sensor(device_id, start_date, end_date)
+    external_future = _submit_external(device_id, start_date, end_date) if with_external else None
+    df_sensor = sensor_future.result().copy()
+    if external_future is None:
+        return df_sensor
+    return df_sensor, external_future.result().copy()
+
+def load_compare_data(device_ids: list[str], start_date: str = None, end_date: str = None):
+    """여러 장비의 센서 데이터를 장비별로 동시에 불러와 하나의 데이터프레임으로 합칩니다."""
+    futures = [_submit_compare(device_id, start_date, end_date) for device_id in sorted(device_ids)]
+    frames = [future.result() for future in futures]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    # 장비별 범주형 컬럼이 합쳐지며 object로 바뀌므로 다시 압축
+    return maybe_compact(pd.concat(frames, ignore_index=True))
+
+def adjacent_devices(device_ids: list[str], selected_id: str, radius: int = 1):
+    """목록에서 선택된 장비 앞뒤로 radius개의 장비 ID를 반환합니다."""
+    if selected_id not in device_ids:
+        return []
+    i = device_ids.index(selected_id)
+    neighbours = []
+    for offset in range(1, radius + 1):
+        for j in (i + offset, i - offset):
+            if 0 <= j < len(device_ids):
+                neighbours.append(device_ids[j])
+    return neighbours
+
+def prefetch_adjacent(device_ids: list[str], selected_id: str, with_external: bool = True, radius: int = 1,
+                      start_date: str = None, end_date: str = None):
+    """선택된 장비와 인접한 장비의 같은 기간 데이터를 백그라운드에서 미리 불러옵니다. (결과를 기다리지 않음)"""
+    for device_id in adjacent_devices(device_ids, selected_id, radius):
+        _submit_sensor(device_id, start_date, end_date)
+        if with_external:
+            _submit_external(device_id, start_date, end_date)
+
+def prefetch_adjacent_compare(device_ids: list[str], selected_ids: list[str], radius: int = 1,
+                              start_date: str = None, end_date: str = None):
+    """비교 페이지에서 선택된 장비들과 인접한 장비의 같은 기간 데이터를 미리 불러옵니다."""
+    for selected_id in selected_ids:
+        for device_id in adjacent_devices(device_ids, selected_id, radius):
+            _submit_compare(device_id, start_date, end_date)
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import data_access
+from query_service import deserialize_frame
+
+# 쿼리 서비스 주소 (예: http://127.0.0.1:8765). 설정하지 않으면 UI 프로세스에서 직접 조회합니다.
+QUERY_SERVICE_URL = os.environ.get("QUERY_SERVICE_URL", "").rstrip("/")
+REQUEST_TIMEOUT = float(os.environ.get("QUERY_SERVICE_TIMEOUT", "30"))
+# 모든 페이지가 처음에 조회하는 장비 목록/최신 상태/조회 가능 기간을 프로세스 내에서 보관하는 시간(초)
+LIST_CACHE_TTL = float(os.environ.get("QUERY_CLIENT_CACHE_TTL", "60"))
+
+_list_cache = {}
+_list_cache_lock = threading.Lock()
+
+def _call(name: str, *args, **kwargs):
+    """
+    쿼리 서비스에 함수 호출을 요청합니다. 서비스에 연결할 수 없을 때만 직접 조회합니다.
+    서비스가 오류로 응답하면 직접 조회해도 같은 오류가 나므로 그대로 발생시킵니다.
+    (400: ValueError, 그 외 및 Arrow가 아닌 응답: RuntimeError)
+    """
+    if not QUERY_SERVICE_URL:
+        return getattr(data_access, name)(*args, **kwargs)
+
+    body = json.dumps({"args": list(args), "kwargs": kwargs}).encode()
+    request = urllib.request.Request(
+        f"{QUERY_SERVICE_URL}/call/{name}",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return deserialize_frame(response.headers.get("Content-Type"), response.read())
+    except urllib.error.HTTPError as e:
+        # HTTPError는 URLError의 하위 클래스이므로 연결 실패보다 먼저 처리
+        detail = e.read().decode(errors="replace")
+        if e.code == 400:
+            raise ValueError(detail) from None
+        raise RuntimeError(f"쿼리 서비스 오류: {name} — HTTP {e.code} {detail}") from None
+    except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+        print(f"쿼리 서비스 호출 실패, 직접 조회합니다: {name} — {e}")
+        return getattr(data_access, name)(*args, **kwargs)
+
+def _cached_call(name: str):
+    """인자가 없는 조회 결과를 LIST_CACHE_TTL 동안 보관합니다. 페이지에서 컬럼을 추가하므로 복사본을 반환합니다."""
+    with _list_cache_lock:
+        entry = _list_cache.get(name)
+    if entry is None or time.monotonic() - entry[0] >= LIST_CACHE_TTL:
+        entry = (time.monotonic(), _call(name))
+        with _list_cache_lock:
+            _list_cache[name] = entry
+    return entry[1].copy()
+
+# data_access와 같은 시그니처의 함수들
+def get_overall_equipment_status():
+    return _cached_call('get_overall_equipment_status')
+
+def get_device_list():
+    return _cached_call('get_device_list')
+
+def get_date_bounds():
+    return _cached_call('get_date_bounds')
+
+def get_sensor_data_by_device(device_id: str, start_date: str = None, end_date: str = None):
+    return _call('get_sensor_data_by_device', device_id, start_date, end_date)
+
+def get_external_data_by_device(device_id: str, start_date: str = None, end_date: str = None):
+    return _call('get_external_data_by_device', device_id, start_date, end_date)
+
+def get_sensor_data_for_devices(device_ids: list[str], start_date: str = None, end_date: str = None):
+    return _call('get_sensor_data_for_devices', list(device_ids), start_date, end_date)
+
+def get_state_episodes_by_device(device_id: str):
+    return _call('get_state_episodes_by_device', device_id)
+
+def get_fleet_state_statistics():
+    return _call('get_fleet_state_statistics')
+
+def get_fleet_mtbf(failure_states: tuple[int, ...] = (3,)):
+    return _call('get_fleet_mtbf', failure_states=list(failure_states))
+
+def get_ambient_scores_by_device(device_id: str, start_date: str = None, end_date: str = None):
+    return _call('get_ambient_scores_by_device', device_id, start_date, end_date)
+
+def get_fleet_ambient_scores(threshold: float = 3.0):
+    return _call('get_fleet_ambient_scores', threshold)
+
+def get_sensor_aggregates_by_device(device_id: str, resolution: str = 'hourly'):
+    return _call('get_sensor_aggregates_by_device', device_id, resolution)
@@ -0,0 +1,196 @@
+"""
+data_access 함수를 별도 프로세스에서 제공하는 로컬 쿼리 서비스입니다.
+
+여러 Streamlit 세션이 동시에 무거운 조회를 실행해도 UI 프로세스의 코어 하나에 몰리지 않도록,
+조회와 pandas 후처리는 워커 프로세스 풀에서 실행하고 직렬화된 결과는 서버 프로세스의 캐시에서 공유합니다.
+
+실행:
+    python query_service.py --port 8765 --workers 4
+
+페이지는 query_client 모듈을 통해 같은 함수 시그니처로 호출합니다.
+"""
+import argparse
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import data_access
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 서비스로 노출하는 data_access 함수 목록
+SERVED_FUNCTIONS = (
+    'get_overall_equipment_status',
+    'get_device_list',
+    'get_date_bounds',
+    'get_sensor_data_by_device',
+    'get_external_data_by_device',
+    'get_sensor_data_for_devices',
+    'get_state_episodes_by_device',
+    'get_fleet_state_statistics',
+    'get_fleet_mtbf',
+    'get_sensor_aggregates_by_device',
+    'get_ambient_scores_by_device',
+    'get_fleet_ambient_scores',
+)
+
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+def serialize_frame(df):
+    """DataFrame을 (content_type, bytes) Arrow IPC 스트림으로 직렬화합니다."""
+    # query_client도 이 모듈을 불러오므로 pyarrow는 모듈 로드 시가 아니라 직렬화할 때 불러옴
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return ARROW_CONTENT_TYPE, sink.getvalue().to_pybytes()
+
+def deserialize_frame(content_type: str, payload: bytes):
+    """
+    serialize_frame의 결과를 DataFrame으로 복원합니다.
+    Arrow 이외의 응답은 역직렬화하지 않습니다. (pickle은 응답을 보낸 쪽이 임의 코드를 실행할 수 있음)
+    """
+    if content_type != ARROW_CONTENT_TYPE:
+        raise RuntimeError(f"지원하지 않는 응답 형식입니다: {content_type}")
+    import pyarrow as pa
+    with pa.ipc.open_stream(io.BytesIO(payload)) as reader:
+        return reader.read_all().to_pandas()
+
+def _run_query(name: str, args: list, kwargs: dict):
+    """워커 프로세스에서 data_access 함수를 실행하고 결과를 직렬화합니다."""
+    df = getattr(data_access, name)(*args, **kwargs)
+    return serialize_frame(df)
+
+class QueryCache:
+    """직렬화된 조회 결과를 TTL과 최대 항목 수 기준으로 보관하는 LRU 캐시입니다."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        캐시에 있으면 바로 반환하고, 같은 키를 이미 계산 중이면 그 결과를 기다립니다.
+        (동시에 같은 장비를 연 세션들이 한 번의 조회만 실행하도록)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            future = self._inflight.get(key)
+            if future is None:
+                future = compute()
+                self._inflight[key] = future
+        try:
+            result = future.result()
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """POST /call/<함수명> {"args": [...], "kwargs": {...}} 요청을 처리합니다."""
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, "application/json", json.dumps({"functions": list(SERVED_FUNCTIONS)}).encode())
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def do_POST(self):
+        if self.path == "/cache/clear":
+            self.server.cache.clear()
+            self._send(200, "text/plain", b"ok")
+            return
+
+        prefix = "/call/"
+        name = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        if name not in SERVED_FUNCTIONS:
+            self._send(404, "text/plain", f"unknown function: {name}".encode())
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            args = body.get("args", [])
+            kwargs = body.get("kwargs", {})
+            key = (name, json.dumps(args), json.dumps(kwargs, sort_keys=True))
+            content_type, payload = self.server.cache.get_or_compute(
+                key, lambda: self.server.pool.submit(_run_query, name, args, kwargs)
+            )
+        except ValueError as e:
+            # 잘못된 요청 (예: 조회 기간에 걸치는 파티션이 너무 많음). 클라이언트가 ValueError로 다시 발생시킴
+            self._send(400, "text/plain", str(e).encode())
+            return
+        except Exception as e:
+            self._send(500, "text/plain", f"{type(e).__name__}: {e}".encode())
+            return
+        self._send(200, content_type, payload)
+
+    def _send(self, status: int, content_type: str, payload: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # 요청마다 로그를 남기지 않음
+        pass
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers: int, cache: QueryCache):
+        super().__init__(address, QueryRequestHandler)
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache = cache
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="예지보전 대시보드 로컬 쿼리 서비스")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="조회를 실행할 워커 프로세스 수")
+    parser.add_argument("--cache-ttl", type=float, default=60.0, help="조회 결과 캐시 유지 시간(초)")
+    parser.add_argument("--cache-size", type=int, default=256, help="캐시에 보관할 최대 결과 수")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        parser.error("쿼리 서비스는 조회 결과를 Arrow 형식으로 전송하므로 pyarrow가 필요합니다. (pip install pyarrow)")
+
+    server = QueryServer((args.host, args.port), args.workers, QueryCache(args.cache_size, args.cache_ttl))
+    print(f"쿼리 서비스 시작: http://{args.host}:{args.port} (workers={args.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
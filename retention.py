@@ -0,0 +1,307 @@
+# 장기 운영 DB의 보존 정책, 파티셔닝, 온라인 압축 작업입니다.
+#
+# 1. 파티셔닝: 최신 월을 제외한 원본 레코드(sensor_record / external_data / ir_data)를
+#    월별 파티션 파일(db/partitions/sensor_data_MM.sqlite)로 옮기고 partition_catalog에 기록합니다.
+#    data_access.get_db_connection은 조회 기간에 걸치는 파티션만 ATTACH하여 합쳐서 조회합니다.
+# 2. 보존 정책: 가장 최근 수집일 기준 N일이 지난 원본 레코드는 시간별/일별 집계
+#    (sensor_hourly / sensor_daily)를 만든 뒤 삭제하고, 기간 전체가 만료된 파티션 파일은 통째로 제거합니다.
+# 3. 온라인 실행: WAL 모드와 작은 배치 트랜잭션으로 처리하여 대시보드의 조회를 막지 않습니다.
+#
+# 실행:
+#     python retention.py --retention-days 30
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from data_access import DB_PATH, PARTITIONED_TABLES, SENSOR_COLUMNS
+
+PARTITION_DIR = "db/partitions"
+DEFAULT_RETENTION_DAYS = 30
+# 배치 크기는 SQLite 바인딩 변수 개수 제한(구버전 999개) 이내로 유지 (파티션 복사 시 record_id를 두 번 바인딩)
+DEFAULT_BATCH_SIZE = 400
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partition_catalog (
+    period TEXT PRIMARY KEY,
+    path TEXT,
+    min_date TEXT,
+    max_date TEXT
+);
+"""
+
+def _aggregate_schema(table: str) -> str:
+    stats = ",\n    ".join(f"{col}_avg REAL, {col}_min REAL, {col}_max REAL" for col in SENSOR_COLUMNS)
+    return f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    device_id TEXT,
+    bucket TEXT,
+    record_count INTEGER,
+    max_state INTEGER,
+    {stats},
+    PRIMARY KEY (device_id, bucket)
+);
+"""
+
+# 집계 단위: 시간별 'MM-DD HH', 일별 'MM-DD'
+AGGREGATES = {
+    'sensor_hourly': "collection_date || ' ' || substr(collection_time, 1, 2)",
+    'sensor_daily': "collection_date",
+}
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """압축 작업용 연결을 생성합니다. (WAL 모드로 전환하여 읽기와 동시에 실행)"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.executescript(CATALOG_SCHEMA)
+    for table in AGGREGATES:
+        conn.executescript(_aggregate_schema(table))
+    return conn
+
+def _cutoff_date(conn: sqlite3.Connection, retention_days: int):
+    """가장 최근 수집일로부터 retention_days 이전 날짜(MM-DD)를 반환합니다. (연도는 2024년으로 가정)"""
+    dates = [conn.execute("SELECT MAX(collection_date) FROM main.sensor_record;").fetchone()[0]]
+    dates += [row[0] for row in conn.execute("SELECT max_date FROM partition_catalog;")]
+    dates = [d for d in dates if d]
+    if not dates:
+        return None
+    latest = datetime.strptime(f"2024-{max(dates)}", "%Y-%m-%d")
+    cutoff = latest - timedelta(days=retention_days)
+    # 날짜에 연도가 없으므로 기준일이 연초 이전이면 만료 대상이 없음 (MM-DD 비교가 한 바퀴 돌지 않도록)
+    if cutoff.year < latest.year:
+        return None
+    return cutoff.strftime("%m-%d")
+
+def _attach(conn: sqlite3.Connection, period: str, path: str) -> str:
+    schema = f"p_{period}"
+    attached = {row[1] for row in conn.execute("PRAGMA database_list;")}
+    if schema not in attached:
+        conn.execute(f"ATTACH DATABASE ? AS {schema};", (path,))
+    return schema
+
+def _detach(conn: sqlite3.Connection, schema: str):
+    # SQLite는 한 연결에 최대 10개의 DB만 ATTACH할 수 있으므로 파티션 작업이 끝나면 바로 분리
+    conn.execute(f"DETACH DATABASE {schema};")
+
+def _ensure_partition(conn: sqlite3.Connection, period: str) -> str:
+    """월별 파티션 파일을 만들고(없으면) ATTACH한 뒤 스키마 이름을 반환합니다."""
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+    path = os.path.join(PARTITION_DIR, f"sensor_data_{period}.sqlite")
+    is_new = not os.path.exists(path)
+    if is_new:
+        # 삭제 후 공간을 점진적으로 반환할 수 있도록 incremental auto_vacuum으로 생성
+        part = sqlite3.connect(path)
+        part.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        part.execute("PRAGMA journal_mode=WAL;")
+        part.close()
+    schema = _attach(conn, period, path)
+    for table in PARTITIONED_TABLES:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table} AS SELECT * FROM main.{table} WHERE 0;")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_record ON {table} (record_id);")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_sensor_record_device ON sensor_record (device_id, collection_date);")
+    conn.execute("INSERT OR IGNORE INTO partition_catalog (period, path) VALUES (?, ?);", (period, path))
+    return schema
+
+def _move_batch(conn: sqlite3.Connection, source: str, target: str, record_ids: list):
+    """
+    record_id 묶음을 source 스키마에서 target 스키마로 옮깁니다.
+    WAL 모드에서는 여러 DB 파일에 걸친 트랜잭션이 원자적이지 않으므로, 복사 → 커밋 → 확인 → 삭제 순서로 처리합니다.
+    복사는 target에 이미 있는 record_id를 건너뛰므로, 중간에 중단되어도 다시 실행하면 이어서 정리됩니다.
+    """
+    placeholders = ', '.join('?' * len(record_ids))
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for table in PARTITIONED_TABLES:
+            conn.execute(f"""
+                INSERT INTO {target}.{table}
+                SELECT * FROM {source}.{table}
+                WHERE record_id IN ({placeholders})
+                  AND record_id NOT IN (SELECT record_id FROM {target}.{table} WHERE record_id IN ({placeholders}));
+            """, record_ids + record_ids)
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+
+    copied = conn.execute(
+        f"SELECT COUNT(*) FROM {target}.sensor_record WHERE record_id IN ({placeholders});", record_ids
+    ).fetchone()[0]
+    if copied != len(record_ids):
+        raise RuntimeError(f"파티션 복사 확인 실패: {target}에 {copied}/{len(record_ids)}건만 있습니다.")
+
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for table in PARTITIONED_TABLES:
+            conn.execute(f"DELETE FROM {source}.{table} WHERE record_id IN ({placeholders});", record_ids)
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+
+def _widen_catalog(conn: sqlite3.Connection, period: str):
+    """
+    main에서 옮길 레코드의 기간을 카탈로그 범위에 미리 포함합니다.
+    범위가 비어 있으면 기간 조회가 이 파티션을 ATTACH하지 않으므로, 첫 배치를 옮기기 전에 기록해야
+    이동 중에도 이미 옮겨진 레코드가 조회됩니다. (정확한 범위는 이동 후 _refresh_catalog로 갱신)
+    """
+    min_date, max_date = conn.execute("""
+        SELECT MIN(collection_date), MAX(collection_date) FROM main.sensor_record
+        WHERE substr(collection_date, 1, 2) = ?;
+    """, (period,)).fetchone()
+    if min_date is None:
+        return
+    conn.execute("""
+        UPDATE partition_catalog
+        SET min_date = MIN(COALESCE(min_date, ?), ?), max_date = MAX(COALESCE(max_date, ?), ?)
+        WHERE period = ?;
+    """, (min_date, min_date, max_date, max_date, period))
+
+def _refresh_catalog(conn: sqlite3.Connection, period: str, schema: str):
+    min_date, max_date = conn.execute(f"SELECT MIN(collection_date), MAX(collection_date) FROM {schema}.sensor_record;").fetchone()
+    conn.execute("UPDATE partition_catalog SET min_date = ?, max_date = ? WHERE period = ?;", (min_date, max_date, period))
+
+def partition(conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE):
+    """최신 월을 제외한 main의 원본 레코드를 월별 파티션 파일로 옮깁니다."""
+    latest_period = conn.execute("SELECT MAX(substr(collection_date, 1, 2)) FROM main.sensor_record;").fetchone()[0]
+    if latest_period is None:
+        return []
+    periods = [row[0] for row in conn.execute("""
+        SELECT DISTINCT substr(collection_date, 1, 2) FROM main.sensor_record
+        WHERE substr(collection_date, 1, 2) < ?;
+    """, (latest_period,))]
+
+    for period in periods:
+        schema = _ensure_partition(conn, period)
+        _widen_catalog(conn, period)
+        while True:
+            record_ids = [row[0] for row in conn.execute("""
+                SELECT record_id FROM main.sensor_record
+                WHERE substr(collection_date, 1, 2) = ?
+                LIMIT ?;
+            """, (period, batch_size))]
+            if not record_ids:
+                break
+            _move_batch(conn, "main", schema, record_ids)
+        _refresh_catalog(conn, period, schema)
+        _detach(conn, schema)
+    return periods
+
+def _aggregate(conn: sqlite3.Connection, schema: str, cutoff: str):
+    """cutoff 이전 원본 레코드의 시간별/일별 집계를 main에 저장합니다. (같은 구간은 덮어씀)"""
+    stats = ", ".join(f"AVG({col}), MIN({col}), MAX({col})" for col in SENSOR_COLUMNS)
+    columns = ", ".join(f"{col}_avg, {col}_min, {col}_max" for col in SENSOR_COLUMNS)
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for table, bucket in AGGREGATES.items():
+            conn.execute(f"""
+                INSERT OR REPLACE INTO main.{table} (device_id, bucket, record_count, max_state, {columns})
+                SELECT device_id, {bucket}, COUNT(*), MAX(CAST(annotation_state AS INTEGER)), {stats}
+                FROM {schema}.sensor_record
+                WHERE collection_date < ?
+                GROUP BY device_id, {bucket};
+            """, (cutoff,))
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+
+def _delete_expired(conn: sqlite3.Connection, schema: str, cutoff: str, batch_size: int):
+    """cutoff 이전 원본 레코드를 작은 배치로 삭제합니다."""
+    while True:
+        record_ids = [row[0] for row in conn.execute(
+            f"SELECT record_id FROM {schema}.sensor_record WHERE collection_date < ? LIMIT ?;", (cutoff, batch_size)
+        )]
+        if not record_ids:
+            break
+        placeholders = ', '.join('?' * len(record_ids))
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            for table in PARTITIONED_TABLES:
+                conn.execute(f"DELETE FROM {schema}.{table} WHERE record_id IN ({placeholders});", record_ids)
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+def _delete_expired_scores(conn: sqlite3.Connection, cutoff: str, batch_size: int):
+    """cutoff 이전 레코드의 환경 보정 이상 점수(ambient_score)를 작은 배치로 삭제합니다."""
+    has_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ambient_score';").fetchone()
+    if not has_table:
+        return
+    while True:
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            deleted = conn.execute("""
+                DELETE FROM ambient_score WHERE record_id IN (
+                    SELECT record_id FROM ambient_score WHERE collection_date < ? LIMIT ?
+                );
+            """, (cutoff, batch_size)).rowcount
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        if not deleted:
+            break
+
+def apply_retention(conn: sqlite3.Connection, retention_days: int = DEFAULT_RETENTION_DAYS,
+                    batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    보존 기간이 지난 원본 레코드를 집계로 대체합니다.
+    기간 전체가 만료된 파티션은 파일째 삭제하고, 일부만 만료된 파티션은 배치 삭제 후 공간을 반환합니다.
+    """
+    cutoff = _cutoff_date(conn, retention_days)
+    if cutoff is None:
+        return None
+
+    # 아직 파티션으로 옮기지 않은 main의 만료 레코드
+    _aggregate(conn, "main", cutoff)
+    _delete_expired(conn, "main", cutoff, batch_size)
+    # 점수 테이블은 파티션으로 나누지 않으므로 main에서 한 번에 정리
+    _delete_expired_scores(conn, cutoff, batch_size)
+
+    partitions = conn.execute("SELECT period, path, max_date FROM partition_catalog WHERE min_date < ?;", (cutoff,)).fetchall()
+    for period, path, max_date in partitions:
+        schema = _attach(conn, period, path)
+        _aggregate(conn, schema, cutoff)
+        if max_date < cutoff:
+            # 파티션 전체가 만료: 카탈로그에서 먼저 제외하여 새 조회가 ATTACH하지 않도록 한 뒤 파일 삭제
+            conn.execute("DELETE FROM partition_catalog WHERE period = ?;", (period,))
+            _detach(conn, schema)
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                except OSError as e:
+                    # 다른 프로세스가 파일을 열고 있는 경우(Windows) 삭제되지 않으므로 수동 삭제 안내
+                    print(f"파티션 파일 삭제 실패: {path + suffix} — {e}")
+        else:
+            _delete_expired(conn, schema, cutoff, batch_size)
+            conn.execute(f"PRAGMA {schema}.incremental_vacuum;")
+            _refresh_catalog(conn, period, schema)
+            _detach(conn, schema)
+    return cutoff
+
+def compact(db_path: str = DB_PATH, retention_days: int = DEFAULT_RETENTION_DAYS, batch_size: int = DEFAULT_BATCH_SIZE):
+    """파티셔닝과 보존 정책을 차례로 적용합니다."""
+    conn = connect(db_path)
+    moved = partition(conn, batch_size)
+    cutoff = apply_retention(conn, retention_days, batch_size)
+    # WAL 내용을 본 파일에 반영 (읽기를 막지 않는 PASSIVE 모드)
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE);")
+    conn.close()
+    return moved, cutoff
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 보존 정책 적용 및 파티션 압축")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS, help="원본 레코드 보존 일수")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="한 트랜잭션에서 처리할 레코드 수")
+    args = parser.parse_args()
+
+    moved, cutoff = compact(args.db, args.retention_days, args.batch_size)
+    print(f"파티션으로 이동한 기간(월): {', '.join(moved) if moved else '없음'}")
+    print(f"원본 보존 기준일: {cutoff if cutoff else '-'} 이전 레코드는 시간별/일별 집계로 대체")
+
+if __name__ == "__main__":
+    main()
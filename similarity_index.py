@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+INDEX_PATH = "db/similarity_index.npz"
+# 저장 형식 버전. 형식이 다른 인덱스 파일은 불러오지 않고 새로 생성합니다.
+# (2: 윈도우를 측정 시각 순서로 구성하고 watermark에 마지막 측정 시각을 함께 저장)
+INDEX_VERSION = 2
+
+# 유사도 계산에 사용하는 센서 (PM/NTC/CT1~4)
+SENSOR_COLUMNS = ['PM10_value', 'PM2_5_value', 'PM1_0_value', 'NTC_value', 'CT1_value', 'CT2_value', 'CT3_value', 'CT4_value']
+# 윈도우 하나를 구성하는 레코드 수
+WINDOW_SIZE = 30
+# 윈도우 요약 통계 (센서별 평균, 표준편차, 최소, 최대)
+FEATURE_STATS = ['mean', 'std', 'min', 'max']
+FEATURE_NAMES = [f"{col}_{stat}" for stat in FEATURE_STATS for col in SENSOR_COLUMNS]
+# 저장된 윈도우의 정규화 값 분포가 이만큼(평균 이동량 또는 표준편차의 log 비율) 벗어나면 정규화 기준을 다시 계산
+REFIT_DRIFT = 0.5
+
+def window_features(values: np.ndarray) -> np.ndarray:
+    """
+    (윈도우 수, WINDOW_SIZE, 센서 수) 배열을 받아 윈도우별 요약 벡터 (윈도우 수, 특징 수)를 계산합니다.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.concatenate([
+        np.nanmean(values, axis=1),
+        np.nanstd(values, axis=1),
+        np.nanmin(values, axis=1),
+        np.nanmax(values, axis=1),
+    ], axis=1)
+
+def frame_features(df: pd.DataFrame) -> np.ndarray:
+    """센서 데이터프레임(임의 길이의 한 구간)의 요약 벡터를 계산합니다."""
+    values = df[SENSOR_COLUMNS].to_numpy(dtype=np.float64)
+    return window_features(values[np.newaxis, :, :])
+
+class SimilarityIndex:
+    """
+    장비별 고정 길이 윈도우의 정규화된 요약 벡터를 연속된 NumPy 행렬에 저장하고,
+    주어진 윈도우와 가장 가까운 top-k 윈도우를 검색합니다.
+    """
+
+    def __init__(self, dim: int = len(FEATURE_NAMES)):
+        self.dim = dim
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._size = 0
+        self.device_ids = np.empty(0, dtype=object)
+        self.start_ts = np.empty(0, dtype=object)
+        self.end_ts = np.empty(0, dtype=object)
+        self.first_record_ids = np.empty(0, dtype=np.int64)
+        self.last_record_ids = np.empty(0, dtype=np.int64)
+        # 정규화 기준 (처음 적재한 데이터로 계산, 새 데이터로 분포가 바뀌면 refit()으로 재계산)
+        self.mean = None
+        self.scale = None
+        # 장비별로 윈도우에 반영한 마지막 레코드의 (측정 시각 'MM-DD HH:MM:SS', record_id)
+        self.watermarks = {}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """정규화된 특징 행렬 (윈도우 수, 특징 수)."""
+        return self._matrix[:self._size]
+
+    def normalize(self, features: np.ndarray) -> np.ndarray:
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        if self.mean is None:
+            self._fit(features)
+        normalized = (features - self.mean) / self.scale
+        return np.nan_to_num(normalized, nan=0.0).astype(np.float32)
+
+    def _fit(self, features: np.ndarray):
+        self.mean = np.nanmean(features, axis=0)
+        scale = np.nanstd(features, axis=0)
+        scale[~np.isfinite(scale) | (scale == 0)] = 1.0
+        self.mean = np.nan_to_num(self.mean, nan=0.0)
+        self.scale = scale
+
+    def add(self, features: np.ndarray, device_ids, start_ts, end_ts, first_record_ids, last_record_ids):
+        """새 윈도우들의 요약 벡터를 행렬 끝에 추가합니다. (용량을 두 배씩 늘려 상각 O(1))"""
+        vectors = self.normalize(features)
+        n = len(vectors)
+        if n == 0:
+            return
+        needed = self._size + n
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix), 1024)
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            sq_norms = np.empty(capacity, dtype=np.float32)
+            sq_norms[:self._size] = self._sq_norms[:self._size]
+            self._matrix, self._sq_norms = matrix, sq_norms
+        self._matrix[self._size:needed] = vectors
+        self._sq_norms[self._size:needed] = np.einsum('ij,ij->i', vectors, vectors)
+        self._size = needed
+
+        self.device_ids = np.concatenate([self.device_ids, np.asarray(device_ids, dtype=object)])
+        self.start_ts = np.concatenate([self.start_ts, np.asarray(start_ts, dtype=object)])
+        self.end_ts = np.concatenate([self.end_ts, np.asarray(end_ts, dtype=object)])
+        self.first_record_ids = np.concatenate([self.first_record_ids, np.asarray(first_record_ids, dtype=np.int64)])
+        self.last_record_ids = np.concatenate([self.last_record_ids, np.asarray(last_record_ids, dtype=np.int64)])
+
+    def drift(self) -> float:
+        """
+        저장된 윈도우 전체가 현재 정규화 기준에서 벗어난 정도를 반환합니다.
+        정규화된 특징별 평균의 절댓값과 표준편차의 log 값 중 가장 큰 값입니다. (기준이 맞으면 0에 가까움)
+        """
+        if self._size == 0:
+            return 0.0
+        matrix = self.matrix.astype(np.float64)
+        std = matrix.std(axis=0)
+        log_std = np.abs(np.log(std[std > 0])) if (std > 0).any() else np.zeros(1)
+        return float(max(np.abs(matrix.mean(axis=0)).max(), log_std.max()))
+
+    def refit(self):
+        """현재 저장된 윈도우 전체로 정규화 기준을 다시 계산합니다."""
+        if self._size == 0:
+            return
+        raw = self.matrix.astype(np.float64) * self.scale + self.mean
+        self._fit(raw)
+        vectors = self.normalize(raw)
+        self._matrix[:self._size] = vectors
+        self._sq_norms[:self._size] = np.einsum('ij,ij->i', vectors, vectors)
+
+    def query(self, features: np.ndarray, k: int = 10, exclude_device: str = None) -> pd.DataFrame:
+        """
+        요약 벡터와 가장 가까운(유클리드 거리) top-k 윈도우를 반환합니다.
+        exclude_device를 지정하면 해당 장비의 윈도우는 결과에서 제외합니다.
+        """
+        columns = ['device_id', 'start_ts', 'end_ts', 'first_record_id', 'last_record_id', 'distance']
+        if self._size == 0:
+            return pd.DataFrame(columns=columns)
+
+        q = self.normalize(features)[0]
+        # ||x - q||² = ||x||² - 2 x·q + ||q||²
+        distances = self._sq_norms[:self._size] - 2.0 * (self.matrix @ q) + q @ q
+        if exclude_device is not None:
+            distances = np.where(self.device_ids == exclude_device, np.inf, distances)
+
+        k = min(k, self._size)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        top = top[np.isfinite(distances[top])]
+        return pd.DataFrame({
+            'device_id': self.device_ids[top],
+            'start_ts': self.start_ts[top],
+            'end_ts': self.end_ts[top],
+            'first_record_id': self.first_record_ids[top],
+            'last_record_id': self.last_record_ids[top],
+            'distance': np.sqrt(np.maximum(distances[top], 0.0)),
+        }, columns=columns)
+
+    def update_from_db(self, conn: sqlite3.Connection):
+        """
+        장비별 watermark 이후 새로 적재된 sensor_record를 측정 시각 순서로 읽어 완성된 윈도우만 추가합니다.
+        WINDOW_SIZE에 못 미치는 나머지 레코드는 다음 갱신 때 반영됩니다.
+        새 윈도우로 분포가 REFIT_DRIFT 이상 바뀌면 정규화 기준을 다시 계산합니다.
+        """
+        devices = [row[0] for row in conn.execute("SELECT device_id FROM device_info ORDER BY device_id;")]
+        batches = []
+        for device_id in devices:
+            # 레코드 적재 순서(record_id)가 측정 순서와 다를 수 있으므로 측정 시각 기준으로 윈도우를 구성
+            last_ts, last_record_id = self.watermarks.get(device_id, ('', 0))
+            df = pd.read_sql_query(f"""
+                SELECT record_id, collection_date || ' ' || collection_time AS ts, {', '.join(SENSOR_COLUMNS)}
+                FROM sensor_record
+                WHERE device_id = ? AND (collection_date || ' ' || collection_time, record_id) > (?, ?)
+                ORDER BY collection_date ASC, collection_time ASC, record_id ASC;
+            """, conn, params=(device_id, last_ts, last_record_id))
+            n_windows = len(df) // WINDOW_SIZE
+            if n_windows == 0:
+                continue
+            df = df.iloc[:n_windows * WINDOW_SIZE]
+            values = df[SENSOR_COLUMNS].to_numpy(dtype=np.float64).reshape(n_windows, WINDOW_SIZE, len(SENSOR_COLUMNS))
+            ts = df['ts'].to_numpy(dtype=object).reshape(n_windows, WINDOW_SIZE)
+            record_ids = df['record_id'].to_numpy().reshape(n_windows, WINDOW_SIZE)
+            batches.append((device_id, window_features(values), ts, record_ids))
+            self.watermarks[device_id] = (str(ts[-1, -1]), int(record_ids[-1, -1]))
+
+        if not batches:
+            return
+        # 정규화 기준이 한 장비에 치우치지 않도록 모든 장비의 윈도우를 한 번에 추가
+        self.add(
+            np.concatenate([features for _, features, _, _ in batches]),
+            device_ids=np.concatenate([[device_id] * len(features) for device_id, features, _, _ in batches]),
+            start_ts=np.concatenate([ts[:, 0] for _, _, ts, _ in batches]),
+            end_ts=np.concatenate([ts[:, -1] for _, _, ts, _ in batches]),
+            first_record_ids=np.concatenate([record_ids[:, 0] for _, _, _, record_ids in batches]),
+            last_record_ids=np.concatenate([record_ids[:, -1] for _, _, _, record_ids in batches]),
+        )
+        if self.drift() > REFIT_DRIFT:
+            self.refit()
+
+    def save(self, path: str = INDEX_PATH):
+        """인덱스를 .npz 파일로 저장합니다."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            matrix=self.matrix,
+            device_ids=self.device_ids.astype(str),
+            start_ts=self.start_ts.astype(str),
+            end_ts=self.end_ts.astype(str),
+            first_record_ids=self.first_record_ids,
+            last_record_ids=self.last_record_ids,
+            mean=self.mean if self.mean is not None else np.empty(0),
+            scale=self.scale if self.scale is not None else np.empty(0),
+            watermark_devices=np.array(list(self.watermarks.keys()), dtype=str),
+            watermark_ts=np.array([ts for ts, _ in self.watermarks.values()], dtype=str),
+            watermark_ids=np.array([record_id for _, record_id in self.watermarks.values()], dtype=np.int64),
+            version=INDEX_VERSION,
+        )
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH):
+        """저장된 인덱스를 불러옵니다."""
+        with np.load(path) as data:
+            index = cls(dim=data['matrix'].shape[1])
+            index._matrix = np.ascontiguousarray(data['matrix'], dtype=np.float32)
+            index._size = len(index._matrix)
+            index._sq_norms = np.einsum('ij,ij->i', index._matrix, index._matrix)
+            index.device_ids = data['device_ids'].astype(object)
+            index.start_ts = data['start_ts'].astype(object)
+            index.end_ts = data['end_ts'].astype(object)
+            index.first_record_ids = data['first_record_ids']
+            index.last_record_ids = data['last_record_ids']
+            if len(data['mean']):
+                index.mean = data['mean']
+                index.scale = data['scale']
+            index.watermarks = {
+                device_id: (ts, record_id)
+                for device_id, ts, record_id in zip(
+                    data['watermark_devices'].tolist(), data['watermark_ts'].tolist(), data['watermark_ids'].tolist()
+                )
+            }
+        return index
+
+def load_similarity_index(path: str = INDEX_PATH):
+    """인덱스 파일이 있으면 불러오고, 없거나 저장 형식(INDEX_VERSION)이 다르면 None을 반환합니다."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if 'version' not in data or int(data['version']) != INDEX_VERSION:
+            return None
+    return SimilarityIndex.load(path)
+
+def build_similarity_index(db_path: str, path: str = INDEX_PATH):
+    """기존 인덱스에 새 윈도우를 증분 추가하여 저장합니다. (인덱스가 없으면 새로 생성)"""
+    index = load_similarity_index(path) or SimilarityIndex()
+    conn = sqlite3.connect(db_path)
+    index.update_from_db(conn)
+    conn.close()
+    index.save(path)
+    return index
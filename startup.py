@@ -0,0 +1,171 @@
+"""
+대시보드 시작 시간을 줄이기 위한 워밍업과 첫 화면 표시 시간 측정 도구입니다.
+
+- ensure_warm_up: 서버 프로세스에서 한 번만 DB 파일을 OS 페이지 캐시에 올리고(백그라운드, 최근 데이터부터 상한까지),
+  모든 페이지가 처음에 조회하는 장비 목록, 조회 가능 기간, 최신 상태를 미리 조회해 둡니다.
+- PaintTimer: 페이지 스크립트 시작부터 첫 의미 있는 화면(데이터가 포함된 첫 요소)까지의 시간을 기록합니다.
+
+워밍업 시간과 첫 화면 표시 시간은 logs/startup_timings.jsonl에 누적되며, 다음 명령어로 요약합니다.
+    python startup.py
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+
+TIMINGS_PATH = os.environ.get("STARTUP_TIMINGS_PATH", "logs/startup_timings.jsonl")
+PARTITION_GLOB = "db/partitions/*.sqlite"
+PRIME_CHUNK_SIZE = 1 << 20
+# 페이지 캐시 워밍업 상한. 콜드 스타트에서 전체 이력을 읽느라 디스크를 오래 점유하지 않도록 제한합니다.
+PRIME_MAX_BYTES = int(os.environ.get("STARTUP_PRIME_MAX_MB", "256")) << 20
+PRIME_MAX_SECONDS = float(os.environ.get("STARTUP_PRIME_MAX_SECONDS", "5"))
+
+_write_lock = threading.Lock()
+
+def record_timing(kind: str, name: str, seconds: float, **extra):
+    """측정 결과 한 건을 TIMINGS_PATH에 JSON 한 줄로 추가합니다."""
+    entry = {
+        'kind': kind,
+        'name': name,
+        'ms': round(seconds * 1000, 1),
+        'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'pid': os.getpid(),
+        **extra,
+    }
+    try:
+        os.makedirs(os.path.dirname(TIMINGS_PATH) or ".", exist_ok=True)
+        with _write_lock, open(TIMINGS_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"시작 시간 기록 실패: {e}")
+
+def db_files():
+    """
+    워밍업 대상 파일 목록을 우선순위 순서로 반환합니다.
+    기본 조회 기간의 데이터가 있는 메인 DB와 WAL 파일을 먼저, 월별 파티션은 최근 월부터 나열합니다.
+    """
+    from data_access import DB_PATH
+    paths = [DB_PATH, DB_PATH + "-wal"] + sorted(glob.glob(PARTITION_GLOB), reverse=True)
+    return [path for path in paths if os.path.exists(path)]
+
+def prime_page_cache(paths, max_bytes: int = PRIME_MAX_BYTES, max_seconds: float = PRIME_MAX_SECONDS) -> int:
+    """
+    파일을 순차로 읽어 OS 페이지 캐시에 올리고, 읽은 바이트 수를 반환합니다.
+    max_bytes만큼 읽었거나 max_seconds가 지나면 남은 파일은 읽지 않습니다.
+    """
+    total = 0
+    buffer = bytearray(PRIME_CHUNK_SIZE)
+    deadline = time.perf_counter() + max_seconds
+    for path in paths:
+        if total >= max_bytes or time.perf_counter() >= deadline:
+            break
+        try:
+            with open(path, 'rb', buffering=0) as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                while total < max_bytes and time.perf_counter() < deadline:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    total += n
+        except OSError as e:
+            print(f"페이지 캐시 워밍업 실패: {path} — {e}")
+    return total
+
+def _prime_and_record():
+    start = time.perf_counter()
+    nbytes = prime_page_cache(db_files())
+    elapsed = time.perf_counter() - start
+    record_timing('warm_up', 'prime_page_cache', elapsed, bytes=nbytes)
+    print(f"페이지 캐시 워밍업: {nbytes / 1024 ** 2:,.1f}MB, {elapsed * 1000:,.0f}ms")
+
+def warm_up(prime_in_background: bool = True) -> dict:
+    """
+    DB 파일을 페이지 캐시에 올리고 장비 목록/조회 가능 기간/최신 상태 캐시를 채운 뒤, 단계별 소요 시간(초)을 반환합니다.
+    페이지 캐시 워밍업은 첫 화면을 막지 않도록 기본적으로 백그라운드 스레드에서 실행합니다.
+    """
+    if prime_in_background:
+        threading.Thread(target=_prime_and_record, name="prime-page-cache", daemon=True).start()
+    else:
+        _prime_and_record()
+
+    timings = {}
+    start = time.perf_counter()
+    from query_client import get_device_list, get_date_bounds, get_overall_equipment_status
+    timings['import_query_client'] = time.perf_counter() - start
+
+    loaders = (('device_list', get_device_list), ('date_bounds', get_date_bounds), ('latest_state', get_overall_equipment_status))
+    for name, loader in loaders:
+        start = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            print(f"워밍업 조회 실패: {name} — {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+
+    for name, seconds in timings.items():
+        record_timing('warm_up', name, seconds)
+    print("대시보드 워밍업: " + ", ".join(f"{name} {seconds * 1000:,.0f}ms" for name, seconds in timings.items()))
+    return timings
+
+@st.cache_resource(show_spinner=False)
+def ensure_warm_up() -> dict:
+    """서버 프로세스에서 한 번만(첫 세션이 열릴 때) 워밍업을 실행합니다."""
+    return warm_up()
+
+class PaintTimer:
+    """
+    페이지 스크립트 시작부터 첫 의미 있는 화면 요소를 그릴 때까지의 시간을 측정합니다.
+    세션마다 페이지별로 첫 실행만 기록하며, 프로세스에서 처음 표시한 페이지는 cold로 구분합니다.
+    """
+    _seen_pages = set()
+    _seen_lock = threading.Lock()
+
+    def __init__(self, page: str):
+        self.page = page
+        self.start = time.perf_counter()
+        self.done = page in st.session_state.setdefault('_painted_pages', set())
+
+    def mark_paint(self):
+        if self.done:
+            return
+        self.done = True
+        elapsed = time.perf_counter() - self.start
+        st.session_state['_painted_pages'].add(self.page)
+        with PaintTimer._seen_lock:
+            cold = self.page not in PaintTimer._seen_pages
+            PaintTimer._seen_pages.add(self.page)
+        record_timing('first_paint', self.page, elapsed, cold=cold)
+
+def summarize_timings(path: str = TIMINGS_PATH):
+    """기록된 측정값을 (종류, 이름, cold 여부)별 횟수/중앙값/p95/최댓값(ms)으로 요약합니다."""
+    import pandas as pd
+
+    df = pd.read_json(path, lines=True)
+    if 'cold' not in df:
+        df['cold'] = None
+    df['cold'] = df['cold'].map({True: 'cold', False: 'warm'}).fillna('-')
+    return (
+        df.groupby(['kind', 'name', 'cold'])['ms']
+        .agg(count='count', median='median', p95=lambda s: s.quantile(0.95), max='max')
+        .reset_index()
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 워밍업/첫 화면 표시 시간 요약")
+    parser.add_argument("--path", default=TIMINGS_PATH, help="측정 기록 파일 (JSON Lines)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"측정 기록이 없습니다: {args.path} (대시보드를 한 번 실행한 뒤 다시 시도하세요)")
+        return
+    report = summarize_timings(args.path)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+
+if __name__ == "__main__":
+    main()
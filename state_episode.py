@@ -0,0 +1,167 @@
+import argparse
+import sqlite3
+from datetime import datetime
+
+# 장비별 연속 상태 구간(episode) 테이블
+#
+# 실행 (적재 스크립트가 증분 갱신하므로 보통은 필요 없음. 구간 규칙이 바뀐 뒤 기존 DB를 다시 계산할 때 사용):
+#     python state_episode.py --rebuild
+# sensor_record를 시간순으로 보았을 때 같은 annotation_state가 이어지는 구간을 한 행으로 압축합니다.
+# 수집은 날짜별로 띄엄띄엄 이루어지므로, 레코드 사이 간격이 MAX_GAP_SECONDS를 넘으면 같은 상태라도 구간을 나눕니다.
+STATE_EPISODE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_episode (
+    episode_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_id TEXT,
+    state TEXT,
+    start_ts TEXT,
+    end_ts TEXT,
+    record_count INTEGER,
+    first_record_id INTEGER,
+    last_record_id INTEGER,
+    FOREIGN KEY (device_id) REFERENCES device_info(device_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_state_episode_device ON state_episode (device_id, start_ts);
+
+CREATE TABLE IF NOT EXISTS state_episode_progress (
+    device_id TEXT PRIMARY KEY,
+    last_record_id INTEGER
+);
+"""
+
+# 같은 구간으로 이어 붙일 수 있는 레코드 간 최대 간격(초). 수집 주기(수 초)보다 충분히 크고 수집일 간 간격보다 작게 설정
+MAX_GAP_SECONDS = 600
+
+def _to_seconds(ts: str):
+    """'MM-DD HH:MM:SS'를 2024년 기준 초 단위 시각으로 변환합니다. (형식이 잘못되면 None)"""
+    try:
+        day = datetime(2024, int(ts[0:2]), int(ts[3:5])).toordinal()
+        return day * 86400 + int(ts[6:8]) * 3600 + int(ts[9:11]) * 60 + int(ts[12:14])
+    except (TypeError, ValueError):
+        return None
+
+def is_gap(earlier: str, later: str, max_gap_seconds: int = MAX_GAP_SECONDS) -> bool:
+    """두 시각('MM-DD HH:MM:SS') 사이가 수집 공백(max_gap_seconds 초과)인지 반환합니다."""
+    start, end = _to_seconds(earlier), _to_seconds(later)
+    return start is not None and end is not None and end - start > max_gap_seconds
+
+def create_state_episode_tables(conn: sqlite3.Connection):
+    """state_episode 관련 테이블과 인덱스를 생성합니다."""
+    conn.executescript(STATE_EPISODE_SCHEMA)
+
+def update_state_episodes(conn: sqlite3.Connection):
+    """
+    마지막 갱신 이후 새로 적재된 sensor_record만 읽어 state_episode를 증분 갱신합니다.
+    장비별로 처리한 마지막 record_id를 state_episode_progress에 기록합니다.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT DISTINCT sr.device_id
+        FROM sensor_record sr
+        LEFT JOIN state_episode_progress p ON sr.device_id = p.device_id
+        WHERE sr.record_id > COALESCE(p.last_record_id, 0);
+    """)
+    for (device_id,) in cur.fetchall():
+        _update_device_episodes(cur, device_id)
+
+def rebuild_state_episodes(conn: sqlite3.Connection):
+    """state_episode를 비우고 sensor_record 전체로부터 다시 생성합니다."""
+    conn.execute("DELETE FROM state_episode;")
+    conn.execute("DELETE FROM state_episode_progress;")
+    update_state_episodes(conn)
+
+def _update_device_episodes(cur: sqlite3.Cursor, device_id: str):
+    cur.execute("SELECT last_record_id FROM state_episode_progress WHERE device_id = ?", (device_id,))
+    row = cur.fetchone()
+    last_record_id = row[0] if row else 0
+
+    # 새로 들어온 레코드 (시간순)
+    cur.execute("""
+        SELECT record_id, collection_date || ' ' || collection_time AS ts, annotation_state
+        FROM sensor_record
+        WHERE device_id = ? AND record_id > ?
+        ORDER BY ts ASC, record_id ASC;
+    """, (device_id, last_record_id))
+    new_rows = cur.fetchall()
+    if not new_rows:
+        return
+
+    # 현재 이어 붙일 수 있는 마지막 구간
+    cur.execute("""
+        SELECT episode_id, state, start_ts, end_ts, record_count, first_record_id, last_record_id
+        FROM state_episode
+        WHERE device_id = ?
+        ORDER BY end_ts DESC, last_record_id DESC
+        LIMIT 1;
+    """, (device_id,))
+    last = cur.fetchone()
+
+    # 과거 시점의 레코드가 뒤늦게 들어온 경우 해당 장비의 구간만 다시 계산
+    if last is not None and new_rows[0][1] < last[3]:
+        cur.execute("DELETE FROM state_episode WHERE device_id = ?", (device_id,))
+        cur.execute("""
+            SELECT record_id, collection_date || ' ' || collection_time AS ts, annotation_state
+            FROM sensor_record
+            WHERE device_id = ?
+            ORDER BY ts ASC, record_id ASC;
+        """, (device_id,))
+        new_rows = cur.fetchall()
+        last = None
+
+    episode = list(last) if last is not None else None
+    max_record_id = last_record_id
+    for record_id, ts, state in new_rows:
+        max_record_id = max(max_record_id, record_id)
+        # 같은 상태라도 수집 공백을 사이에 두면 새 구간으로 시작
+        if episode is not None and episode[1] == state and not is_gap(episode[3], ts):
+            episode[3] = ts
+            episode[4] += 1
+            episode[6] = record_id
+        else:
+            if episode is not None:
+                _save_episode(cur, device_id, episode)
+            episode = [None, state, ts, ts, 1, record_id, record_id]
+    _save_episode(cur, device_id, episode)
+
+    cur.execute("""
+        INSERT OR REPLACE INTO state_episode_progress (device_id, last_record_id) VALUES (?, ?)
+    """, (device_id, max_record_id))
+
+def _save_episode(cur: sqlite3.Cursor, device_id: str, episode: list):
+    episode_id, state, start_ts, end_ts, record_count, first_record_id, last_record_id = episode
+    if episode_id is None:
+        cur.execute("""
+            INSERT INTO state_episode (
+                device_id, state, start_ts, end_ts, record_count, first_record_id, last_record_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (device_id, state, start_ts, end_ts, record_count, first_record_id, last_record_id))
+    else:
+        cur.execute("""
+            UPDATE state_episode
+            SET end_ts = ?, record_count = ?, last_record_id = ?
+            WHERE episode_id = ?
+        """, (end_ts, record_count, last_record_id, episode_id))
+
+def main():
+    from data_access import DB_PATH, attach_partitions
+
+    parser = argparse.ArgumentParser(description="장비 상태 구간(state_episode) 갱신")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로")
+    parser.add_argument("--rebuild", action="store_true", help="기존 구간을 지우고 전체 레코드로 다시 생성")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    create_state_episode_tables(conn)
+    # 파티션으로 분리된 과거 레코드도 함께 구간에 반영
+    attach_partitions(conn)
+    if args.rebuild:
+        rebuild_state_episodes(conn)
+    else:
+        update_state_episodes(conn)
+    conn.commit()
+    episodes, devices = conn.execute("SELECT COUNT(*), COUNT(DISTINCT device_id) FROM state_episode;").fetchone()
+    conn.close()
+    print(f"상태 구간 수: {episodes} (장비 {devices}대)")
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,52 @@
 import streamlit as st
 import pandas as pd
-from datetime import date
+import numpy as np
+from datetime import datetime, timedelta
 
-# 장비 상태 매핑 및 색상 정의
-STATE_MAP = {0: '정상', 1: '주의', 2: '경고', 3: '위험'}
-COLOR_MAP = {'정상': 'green', '주의': 'yellow', '경고': 'orange', '위험': 'red'}
+from constants import STATE_MAP, COLOR_MAP
+from state_episode import MAX_GAP_SECONDS
 
-def apply_date_filter(df: pd.DataFrame, key_prefix: str = ""): # key_prefix 추가
+# 기간 필터의 기본 조회 기간(일). 첫 화면에서 전체 이력 대신 최근 파티션만 읽도록 제한하며,
+# retention.py의 기본 원본 보존 기간과 같습니다. 사이드바에 현재 조회 기간과 전체 수집 기간을 함께 표시합니다.
+DEFAULT_WINDOW_DAYS = 30
+# 순서 기반 x축에 표시할 최대 레이블 수
+MAX_X_TICKS = 12
+HOVER_TIME_TEMPLATE = ('%{customdata[0]:02d}-%{customdata[1]:02d} '
+                       '%{customdata[2]:02d}:%{customdata[3]:02d}:%{customdata[4]:02d}')
+
+def select_date_range(date_bounds: pd.DataFrame, key_prefix: str = ""):
     """
-    데이터프레임에 날짜 필터를 적용하고 필터링된 데이터프레임을 반환합니다.
-    Streamlit의 date_input 위젯을 사이드바에 표시합니다.
+    사이드바에 기간 필터를 표시하고 선택된 기간을 ('MM-DD', 'MM-DD')로 반환합니다.
+    선택한 기간은 조회 함수에 그대로 전달하여 해당 기간의 파티션만 읽도록 합니다.
+    기본값은 마지막 날짜까지의 DEFAULT_WINDOW_DAYS일이며, 선택할 수 없으면 None을 반환합니다.
     """
     st.sidebar.header("기간 필터")
-    
-    if df.empty:
+
+    if date_bounds.empty or date_bounds[['min_date', 'max_date']].isna().values.any():
         st.sidebar.warning("필터링할 데이터가 없습니다.")
-        return df
+        return None
 
-    min_date = df['timestamp'].min().date()
-    max_date = df['timestamp'].max().date()
+    # collection_date는 'MM-DD' 형식이므로 연도를 2024년으로 고정
+    min_date = datetime.strptime(f"2024-{date_bounds['min_date'].iloc[0]}", '%Y-%m-%d').date()
+    max_date = datetime.strptime(f"2024-{date_bounds['max_date'].iloc[0]}", '%Y-%m-%d').date()
+    default_start = max(min_date, max_date - timedelta(days=DEFAULT_WINDOW_DAYS - 1))
 
-    start_date = st.sidebar.date_input('시작일', min_date, min_value=min_date, max_value=max_date, key=f"{key_prefix}_start_date")
+    start_date = st.sidebar.date_input('시작일', default_start, min_value=min_date, max_value=max_date, key=f"{key_prefix}_start_date")
     end_date = st.sidebar.date_input('종료일', max_date, min_value=min_date, max_value=max_date, key=f"{key_prefix}_end_date")
 
     if start_date > end_date:
         st.sidebar.error('오류: 종료일은 시작일보다 빠를 수 없습니다.')
-        return pd.DataFrame() # 빈 데이터프레임 반환
-    
-    mask = (df['timestamp'].dt.date >= start_date) & (df['timestamp'].dt.date <= end_date)
-    df_filtered = df.loc[mask]
-    
-    return df_filtered
+        return None
+
+    # 기본값이 전체 이력이 아니므로 현재 조회 기간과 전체 수집 기간을 함께 표시
+    st.sidebar.caption(
+        f"조회 기간: {start_date:%m-%d} ~ {end_date:%m-%d} ({(end_date - start_date).days + 1}일) · "
+        f"전체 수집 기간: {min_date:%m-%d} ~ {max_date:%m-%d}"
+    )
+    if start_date > min_date:
+        st.sidebar.caption(f"기본 조회 기간은 마지막 수집일부터 {DEFAULT_WINDOW_DAYS}일입니다. 이전 데이터는 시작일을 앞당겨 조회하세요.")
+
+    return start_date.strftime('%m-%d'), end_date.strftime('%m-%d')
 
 def configure_xaxis(fig):
     """
@@ -38,3 +54,81 @@ def configure_xaxis(fig):
     """
     fig.update_xaxes(type='category', tickangle=-45)
     return fig
+
+def _ordinal_positions(timestamps: pd.Series):
+    """
+    측정 시점을 순서 기반 x 위치로 변환합니다.
+    측정 날짜가 불연속적이므로 실제 시간 간격 대신 측정 순서를 x축으로 사용하고,
+    수집 공백(MAX_GAP_SECONDS 초과)마다 빈 칸을 하나 두어 공백 구간을 구분합니다.
+    """
+    unique = np.unique(timestamps.dropna().to_numpy(dtype='datetime64[ms]'))
+    gaps = np.diff(unique) > np.timedelta64(MAX_GAP_SECONDS, 's')
+    positions = np.arange(len(unique)) + np.concatenate(([0], np.cumsum(gaps)))
+    return unique, positions.astype(np.float64)
+
+def _sparse_ticks(unique: np.ndarray, positions: np.ndarray):
+    # 측정 날짜별 첫 시점에만 레이블을 두고, 날짜가 많으면 MAX_X_TICKS개 이하로 줄임
+    days = unique.astype('datetime64[D]')
+    first = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1]))) if len(days) else np.array([], dtype=int)
+    step = max(1, -(-len(first) // MAX_X_TICKS))
+    first = first[::step]
+    ticktext = pd.to_datetime(unique[first]).strftime('%m-%d %H:%M').tolist()
+    return positions[first].tolist(), ticktext
+
+def build_line_chart(df: pd.DataFrame, y, x: str = 'timestamp', color: str = None,
+                     title: str = None, labels: dict = None, markers: bool = False):
+    """
+    WebGL(Scattergl) 트레이스로 시계열 선 차트를 생성합니다.
+    측정 날짜가 불연속적이므로 x축은 측정 순서를 사용하고, 날짜별 첫 시점에만 '월-일 시:분' 레이블을 표시합니다.
+    수집 공백에서는 선을 끊어 공백 구간이 이어져 보이지 않도록 합니다. 실제 측정 시점은 hover로 확인합니다.
+    """
+    # plotly는 import 비용이 크므로 차트를 그릴 때 불러옴
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    labels = labels or {}
+    y_columns = [y] if isinstance(y, str) else list(y)
+    groups = df.groupby(color, sort=True, observed=True) if color else [(None, df)]
+    mode = 'lines+markers' if markers else 'lines'
+    unique, positions = _ordinal_positions(df[x])
+
+    fig = go.Figure()
+    i = 0
+    for key, group in groups:
+        group = group[group[x].notna()].sort_values(x, kind='stable')
+        times = group[x].to_numpy(dtype='datetime64[ms]')
+        x_values = positions[np.searchsorted(unique, times)]
+        # hover용 측정 시점은 문자열 대신 (월, 일, 시, 분, 초) 정수 배열로 보내 바이너리로 인코딩되게 함
+        ts = group[x].dt
+        hover_times = np.column_stack([ts.month, ts.day, ts.hour, ts.minute, ts.second]).astype(np.uint8)
+        # 같은 트레이스 안에서 수집 공백이 있는 지점에 NaN을 넣어 선을 끊음
+        breaks = np.flatnonzero(np.diff(times) > np.timedelta64(MAX_GAP_SECONDS, 's')) + 1
+        x_values = np.insert(x_values, breaks, np.nan).astype(np.float32)
+        hover_times = np.insert(hover_times, breaks, 0, axis=0)
+        for col in y_columns:
+            if color and len(y_columns) == 1:
+                name = str(key)
+            elif color:
+                name = f"{key} - {col}"
+            else:
+                name = col
+            fig.add_trace(go.Scattergl(
+                x=x_values,
+                y=np.insert(group[col].to_numpy(dtype=np.float32), breaks, np.nan),
+                customdata=hover_times,
+                mode=mode,
+                name=name,
+                line=dict(color=qualitative.Plotly[i % len(qualitative.Plotly)]),
+                marker=dict(color=qualitative.Plotly[i % len(qualitative.Plotly)]),
+                hovertemplate=HOVER_TIME_TEMPLATE + f"<br>{name}: %{{y}}<extra></extra>",
+            ))
+            i += 1
+
+    tickvals, ticktext = _sparse_ticks(unique, positions)
+    y_title = labels.get('value') if len(y_columns) > 1 else labels.get(y_columns[0], labels.get('value', y_columns[0]))
+    legend_title = labels.get(color, color) if color else labels.get('variable', '')
+    fig.update_layout(title=title, xaxis_title=labels.get(x, '측정 시점'), yaxis_title=y_title,
+                      legend_title_text=legend_title, showlegend=True)
+    fig.update_xaxes(type='linear', tickmode='array', tickvals=tickvals, ticktext=ticktext,
+                     tickangle=-45, showgrid=True)
+    return fig